@@ -0,0 +1,299 @@
+import os
+import json
+import math
+import time
+import heapq
+import argparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from dotenv import load_dotenv
+from dedup import QuestionIndex
+from prompts import PromptBuilder
+from questions import QuestionGenerator, SUBJECTS, DIFFICULTIES
+
+"""
+In this module, a bank of questions is built ahead of time for offline play.
+Requests for every subject and difficulty of the selection screen are sent by a
+pool of worker processes, the results are checked and de-duplicated as they come
+in and written to the bank file in bulk. A checkpoint file records the requests
+that are done, so an interrupted run carries on where it stopped.
+"""
+
+BANK_PATH = "question_bank.jsonl"
+
+class RateLimiter:
+    """
+    A token bucket: allows on average rate requests per second,
+    with bursts of up to burst requests
+    """
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.last = time.monotonic()
+
+    def acquire(self):
+        """ Waits until a request is allowed"""
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            time.sleep((1 - self.tokens) / self.rate)
+
+def fetch_job(job, url, apikey, structured):
+    """
+    Runs in a worker process: fetches one batch of questions for a job
+    (subject, difficulty, batch number, size). Returns the job and the questions
+    as dictionaries, or None if the request failed (the parent retries it)
+    """
+    subject, difficulty, batch, n = job
+    try:
+        questions = QuestionGenerator.fetch(url, apikey, QuestionGenerator.topic(subject), difficulty, n, PromptBuilder(structured), batch)
+    except Exception:
+        return job, None
+    return job, [question_record(job, question) for question in questions]
+
+def question_record(job, question) -> dict:
+    """ The line of the bank file for a question"""
+    answers = question.get_answers()
+    return {
+        "job": job_key(job),
+        "subject": job[0],
+        "difficulty": job[1],
+        "question": question.get_question_text(),
+        "choices": answers,
+        "answer": "ABCD"[answers.index(question.get_correct_answer())]
+    }
+
+def job_key(job) -> str:
+    subject, difficulty, batch, _ = job
+    return f"{subject}|{difficulty}|{batch}"
+
+class BankBuilder:
+    """
+    Builds the question bank. The questions of finished jobs are buffered and written
+    in bulk; the bank file is synced before the jobs are recorded in the checkpoint so
+    that a job is never marked done before its questions are safely on disk.
+    Every line of the bank also names its job, so a job whose questions were written
+    just before the run stopped is not fetched again either.
+    A failed request is tried again up to retries times, after backoff seconds and twice
+    as long every time; the retries go through the rate limiter like the other requests.
+    Duplicates and invalid questions are made up for with more batches (each with a slightly
+    different prompt) until a subject and difficulty has its questions, but no more than
+    overfetch times the batches it would need if every question was kept.
+    """
+    def __init__(self, path: str = BANK_PATH, url: str = None, apikey: str = None,
+                 workers: int = 4, rate: float = 2.0, batch: int = 15, retries: int = 2, flush: int = 200,
+                 structured: bool = False, backoff: float = 1.0, overfetch: int = 3):
+        self.path = path
+        self.checkpoint = f"{path}.checkpoint"
+        self.url = url or QuestionGenerator.URL
+        self.apikey = apikey
+        self.workers = workers
+        self.limiter = RateLimiter(rate, burst = workers)
+        self.batch = batch
+        self.retries = retries
+        self.backoff = backoff
+        self.overfetch = overfetch
+        self.flush_size = flush
+        self.structured = structured
+        # every question of the bank is kept, however many there are
+        self.index = QuestionIndex(limit = None)
+        self.done = set()
+        # failed jobs waiting to be tried again: (time, job) in a heap, and the attempts of every job
+        self.waiting = []
+        self.attempts = {}
+        # for every subject and difficulty: the questions in the bank, the next batch number
+        # and the batches queued or in flight
+        self.counts = {}
+        self.next_batch = {}
+        self.outstanding = {}
+        self.queue = deque()
+        self.per_pair = 0
+        self.buffer = []
+        self.finished = []
+        self.accepted = 0
+        self.duplicates = 0
+        self.failed_jobs = 0
+        self.failures = 0
+        self.reported = 0
+        self.__resume()
+
+    def __resume(self):
+        """ Reads the checkpoint and the questions already in the bank back in"""
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint, encoding = "utf-8") as file:
+                self.done = {line.strip() for line in file if line.strip()}
+        if os.path.exists(self.path):
+            with open(self.path, encoding = "utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # the last line can be cut short if the run stopped while writing
+                        continue
+                    self.index.add(record["question"], record["choices"])
+                    self.done.add(record["job"])
+                    pair = (record["subject"], record["difficulty"])
+                    self.counts[pair] = self.counts.get(pair, 0) + 1
+
+    def max_batches(self, per_pair: int) -> int:
+        """ The most batches fetched for a subject and difficulty"""
+        return math.ceil(per_pair / self.batch) * self.overfetch
+
+    def jobs(self, per_pair: int, pair = None):
+        """
+        The next jobs for the questions still missing for per_pair questions of every subject
+        and difficulty (or only of pair), skipping the batches that are done already
+        """
+        pairs = [(subject, difficulty) for subject in SUBJECTS for difficulty in DIFFICULTIES] if pair is None else [pair]
+        for subject, difficulty in pairs:
+            key = (subject, difficulty)
+            missing = per_pair - self.counts.get(key, 0)
+            batch = self.next_batch.get(key, 0)
+            for _ in range(math.ceil(max(missing, 0) / self.batch)):
+                while batch < self.max_batches(per_pair) and job_key((subject, difficulty, batch, self.batch)) in self.done:
+                    batch += 1
+                if batch >= self.max_batches(per_pair):
+                    break
+                yield (subject, difficulty, batch, self.batch)
+                batch += 1
+            self.next_batch[key] = batch
+
+    def __schedule(self, jobs):
+        for job in jobs:
+            pair = (job[0], job[1])
+            self.outstanding[pair] = self.outstanding.get(pair, 0) + 1
+            self.queue.append(job)
+
+    def __settle(self, pair):
+        """ A job of the pair is over: more batches are queued if the pair is still short of questions"""
+        self.outstanding[pair] -= 1
+        if self.outstanding[pair] == 0:
+            self.__schedule(self.jobs(self.per_pair, pair))
+
+    def __collect(self, job, records):
+        if records is None:
+            self.failures += 1
+            key = job_key(job)
+            attempts = self.attempts[key] = self.attempts.get(key, 0) + 1
+            if attempts > self.retries:
+                self.failed_jobs += 1
+                self.__settle((job[0], job[1]))
+            else:
+                heapq.heappush(self.waiting, (time.monotonic() + self.backoff * 2 ** (attempts - 1), job))
+            return
+        pair = (job[0], job[1])
+        for record in records:
+            if self.counts.get(pair, 0) >= self.per_pair:
+                # the other batches of the pair were enough already
+                break
+            if self.index.add(record["question"], record["choices"]):
+                self.buffer.append(record)
+                self.accepted += 1
+                self.counts[pair] = self.counts.get(pair, 0) + 1
+            else:
+                self.duplicates += 1
+        self.finished.append(job_key(job))
+        self.__settle(pair)
+        if len(self.buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """ Writes the buffered questions in one go, then checkpoints the finished jobs"""
+        if len(self.buffer) != 0:
+            with open(self.path, "a", encoding = "utf-8") as file:
+                file.write("".join(json.dumps(record) + "\n" for record in self.buffer))
+                file.flush()
+                os.fsync(file.fileno())
+            self.buffer = []
+        if len(self.finished) != 0:
+            with open(self.checkpoint, "a", encoding = "utf-8") as file:
+                file.write("".join(key + "\n" for key in self.finished))
+                file.flush()
+                os.fsync(file.fileno())
+            self.done.update(self.finished)
+            self.finished = []
+
+    def run(self, per_pair: int, report = print):
+        """ Fetches all the jobs with the worker pool and reports the progress"""
+        self.per_pair = per_pair
+        self.__schedule(self.jobs(per_pair))
+        start = time.perf_counter()
+        pending = set()
+        with ProcessPoolExecutor(self.workers) as pool:
+            try:
+                while len(self.queue) != 0 or len(self.waiting) != 0 or len(pending) != 0:
+                    # keep a couple of jobs per worker in flight, no more
+                    if len(pending) >= 2 * self.workers:
+                        pending = self.__drain(pending, start, report)
+                        continue
+                    now = time.monotonic()
+                    if len(self.waiting) != 0 and self.waiting[0][0] <= now:
+                        job = heapq.heappop(self.waiting)[1]
+                    elif len(self.queue) != 0:
+                        job = self.queue.popleft()
+                    else:
+                        # only retries that are not due yet, and maybe some jobs in flight
+                        delay = self.waiting[0][0] - now if len(self.waiting) != 0 else None
+                        if len(pending) != 0:
+                            pending = self.__drain(pending, start, report, delay)
+                        else:
+                            time.sleep(delay)
+                        continue
+                    self.limiter.acquire()
+                    pending.add(pool.submit(fetch_job, job, self.url, self.apikey, self.structured))
+            finally:
+                for future in pending:
+                    future.cancel()
+                self.flush()
+        elapsed = time.perf_counter() - start
+        report(
+            f"{self.accepted} questions in {elapsed:.1f}s ({self.accepted / max(elapsed, 1e-9):.1f} questions/sec), "
+            f"{self.duplicates} duplicates, {self.failed_jobs} failed jobs, {self.failures} failed requests"
+        )
+        short = [f"{subject} ({difficulty}): {self.counts.get((subject, difficulty), 0)}"
+                 for subject in SUBJECTS for difficulty in DIFFICULTIES if self.counts.get((subject, difficulty), 0) < per_pair]
+        if len(short) != 0:
+            report(f"fewer than {per_pair} questions after {self.max_batches(per_pair)} batches for " + ", ".join(short))
+        return self.accepted
+
+    def __drain(self, pending, start, report, timeout = None):
+        finished, pending = wait(pending, timeout, return_when = FIRST_COMPLETED)
+        for future in finished:
+            self.__collect(*future.result())
+        now = time.perf_counter()
+        if now - self.reported >= 1:
+            self.reported = now
+            report(f"{self.accepted} questions ({self.accepted / max(now - start, 1e-9):.1f} questions/sec)")
+        return pending
+
+def main():
+    parser = argparse.ArgumentParser(description = "Builds a bank of questions for offline play")
+    parser.add_argument("--out", default = BANK_PATH, help = "the bank file (JSON lines)")
+    parser.add_argument("--per-pair", type = int, default = 150, help = "questions for every subject and difficulty")
+    parser.add_argument("--url", default = None, help = "the chat completions endpoint, e.g. the local stub_server.py")
+    parser.add_argument("--apikey", default = None)
+    parser.add_argument("--workers", type = int, default = 4)
+    parser.add_argument("--rate", type = float, default = 2.0, help = "requests per second, 0 for no limit")
+    parser.add_argument("--batch", type = int, default = 15, help = "questions per request")
+    parser.add_argument("--retries", type = int, default = 2)
+    parser.add_argument("--overfetch", type = int, default = 3, help = "most batches fetched, as a multiple of the batches needed")
+    parser.add_argument("--backoff", type = float, default = 1.0, help = "seconds before the first retry, doubled for every next one")
+    parser.add_argument("--flush", type = int, default = 200, help = "questions buffered before each write")
+    parser.add_argument("--structured", action = "store_true", help = "ask for JSON schema output (needs endpoint support)")
+    args = parser.parse_args()
+    apikey = args.apikey
+    if apikey is None:
+        load_dotenv()
+        apikey = os.getenv("APIM_SUBSCRIPTION_KEY")
+    builder = BankBuilder(args.out, args.url, apikey, args.workers, args.rate, args.batch, args.retries, args.flush, args.structured, args.backoff, args.overfetch)
+    builder.run(args.per_pair)
+
+if __name__ == "__main__":
+    main()
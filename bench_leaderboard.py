@@ -0,0 +1,53 @@
+import os
+import time
+import random
+import argparse
+import tempfile
+from leaderboard import Leaderboard
+from questions import SUBJECTS, DIFFICULTIES
+
+"""
+A benchmark of the leaderboard: how fast results can be recorded and made durable,
+how long the top-k and rank queries take, and how long a restart takes to read the log back.
+"""
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measures the writes/sec and query latency of the leaderboard")
+    parser.add_argument("--records", type = int, default = 1_000_000)
+    parser.add_argument("--queries", type = int, default = 100_000)
+    parser.add_argument("--path", default = None, help = "the log file, a temporary file by default")
+    args = parser.parse_args()
+    path = args.path or os.path.join(tempfile.mkdtemp(), "leaderboard.log")
+    pairs = [(subject, difficulty) for subject in SUBJECTS for difficulty in DIFFICULTIES]
+    rng = random.Random(0)
+    results = [(*rng.choice(pairs), rng.randrange(16) * 100000) for _ in range(args.records)]
+
+    leaderboard = Leaderboard(path)
+    timings = []
+    start = time.perf_counter()
+    for subject, difficulty, score in results:
+        before = time.perf_counter()
+        leaderboard.record(subject, difficulty, score)
+        timings.append(time.perf_counter() - before)
+    recorded = time.perf_counter() - start
+    leaderboard.close()
+    durable = time.perf_counter() - start
+    timings.sort()
+    print(f"record():  {args.records / recorded:,.0f} writes/sec, "
+          f"p50 {timings[len(timings) // 2] * 1e6:.1f} us, p99 {timings[len(timings) * 99 // 100] * 1e6:.1f} us per call")
+    print(f"durable:   {args.records / durable:,.0f} writes/sec, {leaderboard.commits:,} fsyncs "
+          f"({args.records / leaderboard.commits:,.0f} results per group commit)")
+
+    start = time.perf_counter()
+    leaderboard = Leaderboard(path)
+    print(f"reload:    {time.perf_counter() - start:.2f}s for {args.records:,} results")
+    for name, query in (("top", lambda s, d, score: leaderboard.top(s, d)), ("rank", leaderboard.rank)):
+        queries = [(*rng.choice(pairs), rng.randrange(16) * 100000) for _ in range(args.queries)]
+        start = time.perf_counter()
+        for subject, difficulty, score in queries:
+            query(subject, difficulty, score)
+        print(f"{name + '():':<10} {(time.perf_counter() - start) / args.queries * 1e6:.2f} us per query")
+    leaderboard.close()
+
+if __name__ == "__main__":
+    main()
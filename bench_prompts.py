@@ -0,0 +1,91 @@
+import json
+import time
+import argparse
+import requests
+from prompts import PromptBuilder
+from questions import QuestionGenerator
+from stub_server import serve
+
+"""
+A benchmark of the prompts against the local stand-in server (stub_server.py).
+It compares the old prompt (a fake greeting and four long instruction messages,
+parsed with a plain json.loads) with the prompts of the PromptBuilder, in free form
+and with structured output, and reports the prompt size and the parse failures.
+The failure rates come from the stand-in's simulated replies (--error-rate and
+--chatty-rate), not from a real model. The tokens column is counted with tiktoken when it
+is installed and is only an estimate otherwise (marked with ~); the api tokens column is
+the prompt_tokens reported by the endpoint, which the stand-in does not report (use --url
+for a real endpoint).
+"""
+
+def legacy_messages(subject, difficulty, n):
+    """ The messages that were sent before the PromptBuilder, kept here for comparison"""
+    return [
+        {"role": "user", "content": "Hello!"},
+        {"role": "assistant", "content": "Hello! How can I assist you today?"},
+        {"role": "user", "content": f"We have a total of three difficulties: easy, medium and difficult. Give me only {n} different multiple choice {difficulty} question (who wants to be a millionaire level) about {subject} alone with its answer. The easy level should be around junior high school topic, the medium level should be around senior high school topic, and the hard level should be around university level topic. Output only {n} question. Outputting more questions or fewer questions will be not be tolerated. The choices must include the correct answer."},
+        {"role": "user", "content": "I want you to give an answer that contains only the question, the options, and the letters corresponding to the answers; I don't need the words for everything else. I do not want any text accompanying your reply."},
+        {"role": "user", "content": f"Output only a JSON array without any additional text containing {n} dictionaries that have keys named 'question', 'choices', and 'answer' with questions being a string that contains only the content of the question, choices being a JSON array that contains only the answer options for the questions with A being the first element, B being the second element, C being the third element, and D being the fourth element, and the string answer which contains the letter corresponding to the index of the correct answer in the choices array (e.g. output A if the correct answer lies in the first index of the choices array). Do not include the letter in the choices array."},
+        {"role": "user", "content": f"Your task is to only output only one JSON array containing only {n} dictionaries. The JSON dictionaries can only contain the keys named 'question', 'choices', and 'answer'; any other dictionary keys are not tolerated and are incorrect. Any other output, including English plaintext or JSON dictionaries, is not tolerated. Only valid JSON is accepted. You must not reply to my prompt in english plaintext or with anything that does not constitute valid JSON. Please only output a plain JSON string"}
+    ]
+
+def legacy_parse(data):
+    """ The old parsing: the reply has to be exactly one JSON array"""
+    for question in json.loads(data["choices"][0]["message"]["content"]):
+        question["question"], question["choices"], question["answer"]
+
+def run(name, url, apikey, requests_count, payload, parse, tokens):
+    session = requests.Session()
+    headers = {"Content-Type": "application/json"}
+    if apikey is not None:
+        headers["Ocp-Apim-Subscription-Key"] = apikey
+    failures = 0
+    api_tokens = None
+    start = time.perf_counter()
+    for _ in range(requests_count):
+        response = session.post(url, data = payload, headers = headers)
+        try:
+            data = response.json()
+            api_tokens = data.get("usage", {}).get("prompt_tokens", api_tokens)
+            parse(data)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            failures += 1
+    elapsed = time.perf_counter() - start
+    counted = str(tokens) if PromptBuilder.counting() == "tiktoken" else f"~{tokens}"
+    api_tokens = "n/a" if api_tokens is None else str(api_tokens)
+    print(f"{name:<24}{counted:>8}{api_tokens:>12}{len(payload):>10}{100 * failures / requests_count:>15.1f}%{1000 * elapsed / requests_count:>12.2f}")
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compares the prompt size and parse failures of the old and new prompts")
+    parser.add_argument("--requests", type = int, default = 500)
+    parser.add_argument("--subject", default = "Geography")
+    parser.add_argument("--difficulty", default = "Medium")
+    parser.add_argument("-n", type = int, default = 15)
+    parser.add_argument("--error-rate", type = float, default = 0.02)
+    parser.add_argument("--chatty-rate", type = float, default = 0.10)
+    parser.add_argument("--url", default = None, help = "a real endpoint instead of the stand-in")
+    parser.add_argument("--apikey", default = None)
+    args = parser.parse_args()
+    server = None
+    url = args.url
+    if url is None:
+        server = serve(0, 0.0, args.error_rate, args.chatty_rate)
+        url = f"http://127.0.0.1:{server.server_port}/"
+    counter = PromptBuilder()
+    print("tokens estimated from the words (~), install tiktoken to count them"
+          if PromptBuilder.counting() == "estimate" else "tokens counted with tiktoken")
+    print(f"{'prompt':<24}{'tokens':>8}{'api tokens':>12}{'bytes':>10}{'parse failures':>16}{'ms/request':>12}")
+    messages = legacy_messages(args.subject, args.difficulty, args.n)
+    run("before", url, args.apikey, args.requests, json.dumps({"model": "gpt-35-turbo", "messages": messages}),
+        legacy_parse, counter.count(messages))
+    for structured in (False, True):
+        prompts = PromptBuilder(structured)
+        payload = prompts.payload(args.subject, args.difficulty, args.n)
+        tokens = prompts.tokens[PromptBuilder.key(args.subject, args.difficulty, args.n)]
+        run("after (structured)" if structured else "after (free form)", url, args.apikey, args.requests, payload,
+            QuestionGenerator.parse, tokens)
+    if server is not None:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
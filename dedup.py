@@ -0,0 +1,242 @@
+import os
+import re
+import sys
+import random
+import struct
+import hashlib
+import threading
+from array import array
+
+"""
+In this module, we keep track of every question that has already been shown
+to the players so that the same (or almost the same) question is not asked again
+in a later game, even after the program has been restarted.
+"""
+
+class QuestionIndex:
+    """
+    An index of the questions that have already been accepted.
+    Exact duplicates are found by hashing the normalized question text together
+    with its set of choices. Near duplicates (re-worded questions, shuffled or
+    slightly changed choices) are found with MinHash signatures, which are bucketed
+    into bands (locality sensitive hashing) so that a lookup only compares against
+    a handful of candidates instead of every stored question.
+    The question text (word shingles) and the set of choices have separate signatures:
+    a near duplicate needs a similar text, similar choices and the same numbers in its
+    text, so that two short questions sharing the same choices (e.g. "What is 2+2?" and
+    "What is 2+3?") are not mistaken for each other.
+    At most limit questions are kept (None for no limit); when there are more, the
+    oldest ones are forgotten and may be asked again.
+    """
+    MAGIC = b"WWMQIDX2"
+    PERMUTATIONS = 32
+    CHOICE_PERMUTATIONS = 8
+    BANDS = 8
+    SHINGLE = 2
+    THRESHOLD = 0.7
+    CHOICE_THRESHOLD = 0.5
+    LIMIT = 20000
+    __PRIME = (1 << 61) - 1
+    __MASK = (1 << 32) - 1
+
+    def __init__(self, path: str = None, limit: int = LIMIT):
+        self.path = path
+        self.limit = limit
+        self.__digests = set()
+        self.__order = []
+        self.__signatures = array("I")
+        self.__bands = [{} for _ in range(self.BANDS)]
+        self.__rows = self.PERMUTATIONS // self.BANDS
+        # the text signature, the choice signature and the hash of the numbers in the text
+        self.__width = self.PERMUTATIONS + self.CHOICE_PERMUTATIONS + 1
+        # the index can be shared by the generators fetching in the background
+        self.__lock = threading.Lock()
+        # a fixed seed so that the signatures stay comparable between runs
+        rng = random.Random(1999)
+        self.__coefficients = [
+            (rng.randrange(1, self.__PRIME), rng.randrange(0, self.__PRIME))
+            for _ in range(self.PERMUTATIONS + self.CHOICE_PERMUTATIONS)
+        ]
+        if path is not None and os.path.exists(path):
+            self.__load()
+            self.__bound()
+
+    def __len__(self):
+        return len(self.__digests)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Lower-case the text, drop the punctuation and collapse the whitespace"""
+        return " ".join(re.sub(r"[^\w\s]", " ", str(text).lower()).split())
+
+    def __digest(self, question: str, choices) -> bytes:
+        """The exact key: normalized question text plus the (unordered) set of choices"""
+        normalized = [self.normalize(choice) for choice in choices if choice is not None]
+        key = self.normalize(question) + "\x1f" + "\x1e".join(sorted(normalized))
+        return hashlib.blake2b(key.encode("utf-8"), digest_size = 16).digest()
+
+    def __signature(self, question: str, choices) -> list:
+        """
+        The MinHash signature of the word shingles of the question, followed by the
+        one of its set of choices and by the hash of the numbers in the question.
+        Each shingle is hashed once, then every permutation is a cheap
+        (a * x + b) mod p on top of that hash.
+        """
+        words = self.normalize(question).split()
+        shingles = {" ".join(words[i:i + self.SHINGLE]) for i in range(max(1, len(words) - self.SHINGLE + 1))}
+        options = {self.normalize(choice) for choice in choices if choice is not None} or {""}
+        numbers = " ".join(word for word in words if any(c.isdigit() for c in word))
+        return (
+            self.__min_hashes(shingles, self.__coefficients[:self.PERMUTATIONS])
+            + self.__min_hashes(options, self.__coefficients[self.PERMUTATIONS:])
+            + [int.from_bytes(hashlib.blake2b(numbers.encode("utf-8"), digest_size = 4).digest(), "little")]
+        )
+
+    def __min_hashes(self, items, coefficients) -> list:
+        hashes = [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size = 8).digest(), "little") for s in items]
+        prime = self.__PRIME
+        return [min((a * h + b) % prime for h in hashes) & self.__MASK for a, b in coefficients]
+
+    def __band_keys(self, signature):
+        """
+        One key per band. Only the hash of the rows is kept, a collision
+        just adds a candidate that is then rejected by the full comparison
+        """
+        rows = self.__rows
+        return [hash(tuple(signature[i * rows:(i + 1) * rows])) for i in range(self.BANDS)]
+
+    def __similar(self, signature) -> bool:
+        """
+        Check the candidates sharing at least one band and the numbers of the text
+        with the estimated Jaccard similarity of their text, then of their choices
+        """
+        seen = set()
+        stored = self.__signatures
+        n = self.PERMUTATIONS
+        width = self.__width
+        for band, key in zip(self.__bands, self.__band_keys(signature)):
+            entries = band.get(key, ())
+            if type(entries) == int:
+                entries = (entries,)
+            for entry in entries:
+                if entry in seen:
+                    continue
+                seen.add(entry)
+                offset = entry * width
+                if stored[offset + width - 1] != signature[-1]:
+                    continue
+                same = sum(1 for i in range(n) if stored[offset + i] == signature[i])
+                if same / n < self.THRESHOLD:
+                    continue
+                same = sum(1 for i in range(n, width - 1) if stored[offset + i] == signature[i])
+                if same / self.CHOICE_PERMUTATIONS >= self.CHOICE_THRESHOLD:
+                    return True
+        return False
+
+    def contains(self, question: str, choices) -> bool:
+        """Checks whether the question (or a near duplicate of it) was already accepted"""
+        digest = self.__digest(question, choices)
+        signature = self.__signature(question, choices)
+        with self.__lock:
+            return digest in self.__digests or self.__similar(signature)
+
+    def add(self, question: str, choices) -> bool:
+        """
+        Records the question as seen.
+        Returns False without recording anything if it is a duplicate
+        """
+        digest = self.__digest(question, choices)
+        signature = self.__signature(question, choices)
+        with self.__lock:
+            if digest in self.__digests:
+                return False
+            if self.__similar(signature):
+                return False
+            self.__insert(digest, signature)
+            self.__bound()
+            return True
+
+    def __bound(self):
+        """
+        Forgets the oldest questions once there are more than limit, keeping the newest
+        three quarters of the limit so that the index is only rebuilt once in a while
+        """
+        if self.limit is None or len(self.__order) <= self.limit:
+            return
+        keep = self.limit * 3 // 4
+        width = self.__width
+        start = len(self.__order) - keep
+        order = self.__order[start:]
+        signatures = self.__signatures[start * width:]
+        self.__digests = set()
+        self.__order = []
+        self.__signatures = array("I")
+        self.__bands = [{} for _ in range(self.BANDS)]
+        for entry, digest in enumerate(order):
+            self.__insert(digest, signatures[entry * width:(entry + 1) * width])
+
+    def __insert(self, digest: bytes, signature):
+        entry = len(self.__signatures) // self.__width
+        self.__digests.add(digest)
+        self.__order.append(digest)
+        self.__signatures.extend(signature)
+        # most buckets hold a single question, so a list is only made on a collision
+        for band, key in zip(self.__bands, self.__band_keys(signature)):
+            entries = band.get(key)
+            if entries is None:
+                band[key] = entry
+            elif type(entries) == int:
+                band[key] = [entries, entry]
+            else:
+                entries.append(entry)
+
+    def memory_usage(self) -> int:
+        """Approximate number of bytes held by the index in memory"""
+        total = sys.getsizeof(self.__digests) + sys.getsizeof(self.__order)
+        total += sum(sys.getsizeof(d) for d in self.__order)
+        total += self.__signatures.buffer_info()[1] * self.__signatures.itemsize
+        for band in self.__bands:
+            total += sys.getsizeof(band)
+            for key, entries in band.items():
+                total += sys.getsizeof(key) + sys.getsizeof(entries)
+        return total
+
+    def save(self, path: str = None):
+        """
+        Writes the index to disk. The file is written to a temporary file first
+        and then renamed so that a crash never leaves a half written index behind
+        """
+        path = path or self.path
+        if path is None:
+            return
+        with self.__lock:
+            entries = len(self.__order)
+            tmp = f"{path}.tmp"
+            with open(tmp, "wb") as file:
+                file.write(self.MAGIC)
+                file.write(struct.pack("<II", self.__width, entries))
+                file.write(b"".join(self.__order))
+                self.__signatures.tofile(file)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp, path)
+
+    def __load(self):
+        """ Reads the index back in; a file that is cut short or damaged is ignored (empty index)"""
+        try:
+            with open(self.path, "rb") as file:
+                if file.read(len(self.MAGIC)) != self.MAGIC:
+                    return
+                width, entries = struct.unpack("<II", file.read(8))
+                if width != self.__width:
+                    return
+                digests = file.read(16 * entries)
+                if len(digests) != 16 * entries:
+                    return
+                signatures = array("I")
+                signatures.fromfile(file, width * entries)
+        except (OSError, EOFError, ValueError, struct.error):
+            return
+        n = width
+        for entry in range(entries):
+            self.__insert(digests[16 * entry:16 * (entry + 1)], signatures[entry * n:(entry + 1) * n])
@@ -1,4 +1,6 @@
+import random
 from questions import Question, QuestionGenerator
+from lifelines import LifelineEngine
 
 class UsedLifelineError(Exception):
     """
@@ -9,11 +11,16 @@ class UsedLifelineError(Exception):
 
 class Game:
     """
-    This class tracks the current score of the player, then also checks the status of the lifelines
+    This class tracks the current score of the player, then also checks the status of the lifelines.
+    If a snapshot is given, the state of the game is saved to it after every answer and lifeline
     """
-    def __init__(self):
+    def __init__(self, snapshot = None):
         self.score = 0
         self.generator = None
+        self.engine = LifelineEngine()
+        self.rung = -1
+        self.current = None
+        self.snapshot = snapshot
         self.lifelines = {
             "Phone a Friend": PhoneAFriend(),
             "Fifty-Fifty": FiftyFifty(),
@@ -26,15 +33,48 @@ class Game:
         since the lifelines are only available once only
         """
         if lifeline_name in self.lifelines:
-            return self.lifelines.pop(lifeline_name).use_lifeline(question)
+            result = self.lifelines.pop(lifeline_name).use_lifeline(question, self.engine, self.rung)
+            self.save()
+            return result
         else:
             raise UsedLifelineError(lifeline_name)
     
     def set_generator(self, generator: QuestionGenerator):
         """
-        Generate next question
+        Generate next question.
+        The lifeline answers for the whole ladder are simulated here, once the questions are loaded
         """
         self.generator = generator
+        self.engine = LifelineEngine(generator.difficulty, len(generator.questions), random.randrange(2 ** 32))
+
+    def used_lifelines(self):
+        """
+        The names of the lifelines that were already used
+        """
+        return [name for name in ("Phone a Friend", "Fifty-Fifty", "Ask the Audience") if name not in self.lifelines]
+
+    def save(self):
+        """
+        Saving the state of the game to the snapshot, if there is one
+        """
+        if self.snapshot is not None:
+            self.snapshot.save(self)
+
+    def finish_question(self):
+        """
+        The current question was answered correctly, so the game moves on to the next one
+        """
+        self.current = None
+        self.save()
+
+    def finish(self):
+        """
+        The game is over (won, lost or timed out), so the snapshot is removed
+        before the result is recorded and shown, and a crash from now on does not replay it
+        """
+        self.current = None
+        if self.snapshot is not None:
+            self.snapshot.clear()
 
     def add_score(self, points):
         """
@@ -42,6 +82,16 @@ class Game:
         """
         self.score += points
 
+    def peek(self):
+        """
+        Getting the next question without moving on to it,
+        so that its screen can be prepared while the current one is played
+        """
+        question = self.generator.peek()
+        if question is None:
+            return None
+        return GameQuestion(self, question)
+
     def __iter__(self):
         """
         A function acting as the iterator
@@ -52,7 +102,10 @@ class Game:
         """
         Getting the next question
         """
-        return GameQuestion(self, next(self.generator))
+        question = next(self.generator)
+        self.rung += 1
+        self.current = question
+        return GameQuestion(self, question)
 
 class GameQuestion:
     """
@@ -82,13 +135,14 @@ class GameQuestion:
         correct = self.question.check_answer(answer)
         if correct:
             self.__game.add_score(self.question.weighting)
+            self.__game.finish_question()
         return correct
 
 class Lifeline:
     """
     Parent class for the other lifelines (fifty-fifty, phone a friend, ask the audience)
     """
-    def use_lifeline(self, question: Question):
+    def use_lifeline(self, question: Question, engine: LifelineEngine, rung: int):
         pass
 
 class FiftyFifty(Lifeline):
@@ -96,7 +150,7 @@ class FiftyFifty(Lifeline):
     Inherits from the lifeline class and can modify
     according to the parameter passed in the lifeline class
     """
-    def use_lifeline(self, question: Question):
+    def use_lifeline(self, question: Question, engine: LifelineEngine, rung: int):
         question.remove_two_incorrect()
 
 class PhoneAFriend(Lifeline):
@@ -104,13 +158,15 @@ class PhoneAFriend(Lifeline):
     Inherits from the lifeline class and can modify
     according to the parameter passed in the lifeline class
     """
-    def use_lifeline(self, question: Question):
-        return question.get_correct_answer()
+    def use_lifeline(self, question: Question, engine: LifelineEngine, rung: int):
+        """Returns the answer of the friend and how sure they are about it in percent"""
+        return engine.friend(rung, question)
 
 class AskTheAudience(Lifeline):
     """
     Inherits from the lifeline class and can modify
     according to the parameter passed in the lifeline class
     """
-    def use_lifeline(self, question: Question):
-        return question.get_correct_answer()
\ No newline at end of file
+    def use_lifeline(self, question: Question, engine: LifelineEngine, rung: int):
+        """Returns the votes of the audience in percent for every remaining answer"""
+        return engine.poll(rung, question)
\ No newline at end of file
@@ -0,0 +1,162 @@
+import gc
+import tracemalloc
+from collections import deque
+import pygame
+from game import Game
+from dedup import QuestionIndex
+from screens import Resource, IntroScreen, SelectionScreen, AttractScreen, NoQuestionsMessageScreen
+from questions import NotEnoughQuestionsError, INDEX_PATH
+from prefetch import Prefetcher
+from snapshot import Snapshot
+from leaderboard import Leaderboard
+from main_game import play, SCREEN_WIDTH, SCREEN_HEIGHT
+
+"""
+In this module, the game runs unattended on a cabinet: it goes from the intro to a game,
+the result and the attract screen and back to the intro, forever. The screens, buttons
+and sounds are made once and reused from game to game, and the memory used is measured
+every so often to make sure it does not grow.
+"""
+
+# a cabinet remembers fewer questions than the desktop game: the index stays small
+# in memory and saving it after every game stays cheap
+INDEX_LIMIT = 5000
+
+def live_surfaces():
+    """
+    The number of pygame surfaces that are still referenced and the bytes of their pixels.
+    Surfaces are not tracked by the garbage collector, so they are found through the
+    objects that are (and through the tuples and lists that hold them)
+    """
+    seen = set()
+    size = 0
+    stack = gc.get_objects()
+    while len(stack) != 0:
+        for item in gc.get_referents(stack.pop()):
+            if isinstance(item, pygame.Surface):
+                if id(item) not in seen:
+                    seen.add(id(item))
+                    size += item.get_bytesize() * item.get_width() * item.get_height()
+            elif isinstance(item, (tuple, list, dict)) and not gc.is_tracked(item):
+                stack.append(item)
+    return len(seen), size
+
+def footprint() -> dict:
+    """ The memory used by Python objects (if tracemalloc is tracing) and by the surfaces"""
+    gc.collect()
+    surfaces, surface_bytes = live_surfaces()
+    python_bytes = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+    return {"python_bytes": python_bytes, "surfaces": surfaces, "surface_bytes": surface_bytes}
+
+class Kiosk:
+    """
+    Runs the game in a loop for the cabinets. fetch(subject, difficulty) gives the
+    questions of a game (prefetcher.take by default, a Prefetcher with an index of at
+    most INDEX_LIMIT questions if none is given). Every report_every games the
+    footprint is measured, the last measurements (with the counters of the prefetcher
+    and the times from an answer to the next question) are kept in samples and given to report.
+    Without a snapshot, a game that was stopped by a crash is not resumed
+    """
+    def __init__(self, resource: Resource, leaderboard: Leaderboard, fetch = None, snapshot: Snapshot = None,
+                 result_timeout: float = 8, attract_timeout: float = 30, report_every: int = 100, report = print,
+                 prefetcher: Prefetcher = None):
+        self.resource = resource
+        self.leaderboard = leaderboard
+        self.prefetcher = None
+        if fetch is None:
+            if prefetcher is None:
+                prefetcher = Prefetcher(15, index = QuestionIndex(INDEX_PATH, INDEX_LIMIT))
+            self.prefetcher = prefetcher
+            fetch = self.prefetcher.take
+        self.fetch = fetch
+        self.snapshot = snapshot
+        self.result_timeout = result_timeout
+        self.attract_timeout = attract_timeout
+        self.report_every = report_every
+        self.report = report
+        self.intro = IntroScreen(resource)
+        self.selection = SelectionScreen(resource, self.prefetcher)
+        self.attract = AttractScreen(resource, leaderboard)
+        # the two question screens, reused by every game
+        self.screens = [None, None]
+        self.games = 0
+        self.samples = deque(maxlen = 100)
+        # the times from an answer to the next question of the last games, in ms
+        self.transitions = deque(maxlen = 1000)
+
+    def __new_game(self):
+        """
+        Shows the intro and the selection, returns the new game or None if the window is closed.
+        If not enough questions are found, the player is told so and it starts again from the intro
+        """
+        while True:
+            if not self.intro.display():
+                return None
+            if not self.selection.display():
+                return None
+            try:
+                generator = self.fetch(self.selection.subject, self.selection.difficulty)
+            except NotEnoughQuestionsError:
+                if not NoQuestionsMessageScreen(self.resource).display(self.result_timeout):
+                    return None
+                continue
+            game = Game(self.snapshot)
+            game.set_generator(generator)
+            game.save()
+            return game
+
+    def run(self, games: int = None):
+        """ Plays games until the window is closed, or until the given number of games were played"""
+        game = None
+        if self.snapshot is not None:
+            game = self.snapshot.load()
+        while games is None or self.games < games:
+            self.resource.reset()
+            if game is None:
+                game = self.__new_game()
+                if game is None:
+                    return
+            else:
+                self.resource.use_lifelines(game.used_lifelines())
+            if not play(self.resource, game, self.leaderboard, self.screens, self.result_timeout, self.transitions):
+                return
+            game = None
+            self.games += 1
+            if self.report_every and self.games % self.report_every == 0:
+                self.measure()
+            if not self.attract.display(self.attract_timeout):
+                return
+
+    def measure(self):
+        """ Measures and reports the footprint after the games played so far"""
+        sample = footprint()
+        sample["games"] = self.games
+        sample["prefetch"] = None if self.prefetcher is None else self.prefetcher.stats()
+        sample["index_entries"] = None if self.prefetcher is None else len(self.prefetcher.index)
+        sample["index_bytes"] = None if self.prefetcher is None else self.prefetcher.index.memory_usage()
+        times = sorted(self.transitions)
+        sample["transition_ms"] = None if len(times) == 0 else {"median": times[len(times) // 2], "max": times[-1]}
+        self.samples.append(sample)
+        python_bytes = "n/a" if sample["python_bytes"] is None else f"{sample['python_bytes'] / 1024:,.0f} KiB"
+        self.report(f"{self.games} games: python {python_bytes}, {sample['surfaces']} surfaces ({sample['surface_bytes'] / 1024:,.0f} KiB)")
+        if sample["transition_ms"] is not None:
+            self.report(f"next question shown {sample['transition_ms']['median']:.1f} ms after the answer (median), {sample['transition_ms']['max']:.1f} ms at most")
+        if self.prefetcher is not None:
+            self.report(self.prefetcher.report())
+            self.report(f"question index: {sample['index_entries']:,} questions ({sample['index_bytes'] / 1024:,.0f} KiB)")
+        return sample
+
+    def close(self):
+        if self.prefetcher is not None:
+            self.prefetcher.close()
+
+def main():
+    with Resource(SCREEN_WIDTH, SCREEN_HEIGHT) as resource, Leaderboard() as leaderboard:
+        kiosk = Kiosk(resource, leaderboard, snapshot = Snapshot())
+        try:
+            kiosk.run()
+        finally:
+            kiosk.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import io
+import sys
+import ctypes
+import pygame
+from collections import OrderedDict
+
+"""
+In this module, we keep the positions and the sizes of everything on the screen
+independent of the resolution of the window. The screens are designed for one
+resolution (the design resolution) and the Layout maps it to the real window.
+The AssetCache makes sure an image is only decoded once and only scaled once
+for every size it is shown at, and that a font file is only read once.
+"""
+
+def make_dpi_aware():
+    """
+    On Windows the window would otherwise be stretched by the system on high DPI displays,
+    so the process tells Windows that it handles the scaling itself
+    """
+    if sys.platform != "win32":
+        return
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(2)
+    except (AttributeError, OSError):
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()
+        except (AttributeError, OSError):
+            pass
+
+class Layout:
+    """
+    Maps the coordinates of the design resolution to the window.
+    Positions are stretched to fill the window in both directions while
+    sizes are scaled uniformly so that the images and texts keep their proportions.
+    """
+    def __init__(self, design_width: int, design_height: int, width: int, height: int):
+        self.design_width = design_width
+        self.design_height = design_height
+        self.width = width
+        self.height = height
+        self.scale_x = width / design_width
+        self.scale_y = height / design_height
+        self.scale = min(self.scale_x, self.scale_y)
+
+    def x(self, value: float) -> int:
+        return round(value * self.scale_x)
+
+    def y(self, value: float) -> int:
+        return round(value * self.scale_y)
+
+    def size(self, value: float) -> int:
+        return max(1, round(value * self.scale))
+
+    def rect(self, x: float, y: float, w: float, h: float) -> pygame.Rect:
+        """A rectangle of the design resolution placed and sized in the window"""
+        return pygame.Rect(self.x(x), self.y(y), self.size(w), self.size(h))
+
+class AssetCache:
+    """
+    Keeps every image decoded once and every scaled copy of it once per size.
+    The scaled copies and the fonts are kept in a least recently used order and the
+    oldest ones are dropped when there are too many, so that dragging the border of the
+    window around does not keep every intermediate size forever.
+    A window size needs about 9 scaled images and 5 fonts, so the default limits keep
+    the last 7 sizes or so; going back to an older size scales the images again.
+    """
+    def __init__(self, limit: int = 64, font_limit: int = 32):
+        self.limit = limit
+        self.font_limit = font_limit
+        self.__images = {}
+        self.__scaled = OrderedDict()
+        self.__font_files = {}
+        self.__fonts = OrderedDict()
+        self.decoded = 0
+        self.rescaled = 0
+        self.fonts_made = 0
+
+    def image(self, path: str) -> pygame.Surface:
+        """The decoded image at its original size"""
+        if path not in self.__images:
+            self.__images[path] = pygame.image.load(path).convert_alpha()
+            self.decoded += 1
+        return self.__images[path]
+
+    def scaled(self, path: str, size) -> pygame.Surface:
+        """The image scaled to size (width, height)"""
+        key = (path, int(size[0]), int(size[1]))
+        surface = self.__scaled.get(key)
+        if surface is None:
+            surface = pygame.transform.scale(self.image(path), key[1:])
+            self.rescaled += 1
+            self.__scaled[key] = surface
+            if len(self.__scaled) > self.limit:
+                self.__scaled.popitem(last = False)
+        else:
+            self.__scaled.move_to_end(key)
+        return surface
+
+    def scaled_by(self, path: str, factor: float) -> pygame.Surface:
+        """The image scaled by a factor of its original size"""
+        image = self.image(path)
+        return self.scaled(path, (max(1, round(image.get_width() * factor)), max(1, round(image.get_height() * factor))))
+
+    def font(self, path: str, size: int) -> pygame.font.Font:
+        """The font at the given size, path None is the default system font"""
+        key = (path, size)
+        font = self.__fonts.get(key)
+        if font is None:
+            if path is None:
+                font = pygame.font.SysFont(None, size)
+            else:
+                # the file is read once, every size is made from the bytes in memory
+                if path not in self.__font_files:
+                    with open(path, "rb") as file:
+                        self.__font_files[path] = file.read()
+                font = pygame.font.Font(io.BytesIO(self.__font_files[path]), size)
+            self.fonts_made += 1
+            self.__fonts[key] = font
+            if len(self.__fonts) > self.font_limit:
+                self.__fonts.popitem(last = False)
+        else:
+            self.__fonts.move_to_end(key)
+        return font
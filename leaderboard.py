@@ -0,0 +1,261 @@
+import os
+import json
+import time
+import socket
+import heapq
+import threading
+from queue import SimpleQueue, Empty
+from bisect import bisect_right, insort
+from questions import QuestionGenerator
+
+"""
+In this module, the final scores of every game are kept. The results are appended
+to a log file by a background thread that writes them in groups with a single fsync
+per group, so recording a result never waits for the disk. The best scores of every
+subject and difficulty are kept in memory for the leaderboard.
+"""
+
+LEADERBOARD_PATH = "leaderboard.log"
+
+class ScoreIndex:
+    """
+    The scores of one subject and difficulty. Only the number of games with each distinct
+    score is kept, so the memory does not grow with the number of games. The counts are
+    also summed up in a Fenwick tree in the order of the scores, so the rank of a score
+    takes O(log d) for d distinct scores; the tree is only rebuilt when a score is seen
+    for the first time (rare, the ladder has few distinct scores). The best k results
+    are kept apart so the leaderboard does not have to look through every score
+    """
+    def __init__(self, k: int):
+        self.k = k
+        self.scores = []
+        self.counts = {}
+        self.tree = [0]
+        self.best = []
+        self.count = 0
+
+    def __rebuild(self):
+        """ Builds the Fenwick tree of the counts in O(d)"""
+        tree = [0] + [self.counts[score] for score in self.scores]
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def __at_most(self, position: int) -> int:
+        """ The number of games with one of the first position scores"""
+        total = 0
+        while position > 0:
+            total += self.tree[position]
+            position -= position & -position
+        return total
+
+    def add(self, score: int, record: dict):
+        if score not in self.counts:
+            insort(self.scores, score)
+            self.counts[score] = 1
+            self.__rebuild()
+        else:
+            self.counts[score] += 1
+            position = bisect_right(self.scores, score)
+            while position < len(self.tree):
+                self.tree[position] += 1
+                position += position & -position
+        self.count += 1
+        # the best results sorted from the highest score, the earliest one first on a tie
+        key = (-score, self.count)
+        if len(self.best) < self.k or key < self.best[-1][0]:
+            insort(self.best, (key, record))
+            if len(self.best) > self.k:
+                self.best.pop()
+
+    def extend(self, records: list):
+        """ Adds many results at once (when the log is read back), sorting only once"""
+        start = self.count
+        scores = [record["score"] for record in records]
+        # nlargest is stable, so the earliest result comes first on a tie
+        best = heapq.nlargest(self.k, range(len(records)), key = scores.__getitem__)
+        self.best = sorted(self.best + [((-scores[i], start + i + 1), records[i]) for i in best])[:self.k]
+        for score in scores:
+            self.counts[score] = self.counts.get(score, 0) + 1
+        self.scores = sorted(self.counts)
+        self.__rebuild()
+        self.count += len(records)
+
+    def top(self, k: int) -> list:
+        return [record for _, record in self.best[:k]]
+
+    def rank(self, score: int) -> int:
+        """ 1 for the best score, ties share the same rank"""
+        return self.count - self.__at_most(bisect_right(self.scores, score)) + 1
+
+class Leaderboard:
+    """
+    Records the results of the games. record() only puts the result in the in-memory
+    index and on a queue; the writer thread takes everything waiting on the queue,
+    appends it to the log in one write and syncs it once (group commit).
+    If the disk fails (full, no permission), a group is tried again retries times with a
+    growing pause; then it is given up, counted in lost and the error is given to report,
+    so the writer keeps going and the queue does not grow without end.
+    When it starts, the leaderboard reads the log back in to rebuild the index.
+    """
+    def __init__(self, path: str = LEADERBOARD_PATH, k: int = 10, batch: int = 4096, interval: float = 0.05,
+                 retries: int = 3, report = print):
+        self.path = path
+        self.k = k
+        self.batch = batch
+        self.interval = interval
+        self.retries = retries
+        self.report = report
+        self.kiosk = socket.gethostname()
+        self.index = {}
+        self.lock = threading.Lock()
+        self.queue = SimpleQueue()
+        self.written = 0
+        self.commits = 0
+        self.lost = 0
+        self.error = None
+        self.__closed = False
+        self.__load()
+        self.__writer = threading.Thread(target = self.__write, daemon = True)
+        self.__writer.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding = "utf-8") as file:
+            lines = file.read().splitlines()
+        try:
+            # parsing the whole log as one array is much faster than line by line
+            records = json.loads("[" + ",".join(line for line in lines if line) + "]")
+        except ValueError:
+            # the last line can be cut short if the program stopped while writing
+            records = []
+            for line in lines:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+        groups = {}
+        for record in records:
+            # older results were recorded with the topic asked to the API instead of the subject
+            record["subject"] = QuestionGenerator.subject_of(record["subject"])
+            groups.setdefault((record["subject"], record["difficulty"]), []).append(record)
+        for key, records in groups.items():
+            self.index[key] = ScoreIndex(self.k)
+            self.index[key].extend(records)
+
+    def __add(self, record: dict):
+        key = (record["subject"], record["difficulty"])
+        with self.lock:
+            if key not in self.index:
+                self.index[key] = ScoreIndex(self.k)
+            self.index[key].add(record["score"], record)
+
+    def record(self, subject: str, difficulty: str, score: int, name: str = None) -> dict:
+        """ Records the result of a game, returns straight away"""
+        record = {
+            "time": time.time(),
+            "kiosk": self.kiosk,
+            "name": name,
+            "subject": subject,
+            "difficulty": difficulty,
+            "score": score
+        }
+        self.__add(record)
+        self.queue.put(record)
+        return record
+
+    def top(self, subject: str, difficulty: str, k: int = None) -> list:
+        """ The best k results of a subject and difficulty, the best first"""
+        with self.lock:
+            index = self.index.get((subject, difficulty))
+            return [] if index is None else index.top(k or self.k)
+
+    def rank(self, subject: str, difficulty: str, score: int) -> int:
+        """ The place a score would have on the leaderboard of a subject and difficulty"""
+        with self.lock:
+            index = self.index.get((subject, difficulty))
+            return 1 if index is None else index.rank(score)
+
+    def __write(self):
+        """ The writer thread: one write and one fsync for every group of results"""
+        file = None
+        try:
+            while True:
+                try:
+                    group = [self.queue.get(timeout = self.interval)]
+                except Empty:
+                    continue
+                if group[0] is None:
+                    return
+                stop = False
+                while len(group) < self.batch:
+                    try:
+                        record = self.queue.get_nowait()
+                    except Empty:
+                        break
+                    if record is None:
+                        stop = True
+                        break
+                    group.append(record)
+                data = "".join(json.dumps(record, separators = (",", ":")) + "\n" for record in group).encode("utf-8")
+                for attempt in range(self.retries + 1):
+                    try:
+                        file = file or open(self.path, "ab", buffering = 0)
+                        self.__commit(file, data)
+                        self.written += len(group)
+                        self.commits += 1
+                        break
+                    except OSError as error:
+                        self.error = error
+                        if attempt == self.retries:
+                            self.lost += len(group)
+                            self.report(f"leaderboard: {len(group)} results could not be written to {self.path}: {error}")
+                        else:
+                            time.sleep(self.interval * 2 ** attempt)
+                if stop:
+                    return
+        finally:
+            if file is not None:
+                try:
+                    file.close()
+                except OSError:
+                    pass
+
+    @staticmethod
+    def __commit(file, data: bytes):
+        """ Appends a group and syncs it; a group written only in part is cut off again"""
+        start = file.seek(0, os.SEEK_END)
+        try:
+            view = memoryview(data)
+            while len(view) != 0:
+                view = view[file.write(view):]
+            os.fsync(file.fileno())
+        except OSError:
+            try:
+                file.truncate(start)
+            except OSError:
+                pass
+            raise
+
+    def close(self) -> int:
+        """
+        Waits until every recorded result is on disk (or given up).
+        Returns the number of results that could not be written, and reports them
+        """
+        if self.__closed:
+            return self.lost
+        self.__closed = True
+        self.queue.put(None)
+        self.__writer.join()
+        if self.lost != 0:
+            self.report(f"leaderboard: {self.lost} results were not saved to {self.path} (last error: {self.error})")
+        return self.lost
@@ -0,0 +1,95 @@
+import numpy as np
+
+"""
+In this module, the answers of the audience and of the friend on the phone are simulated.
+All the random draws for the whole ladder are made at once with NumPy when the
+questions are loaded, so using a lifeline during the game is only a table lookup.
+"""
+
+class LifelineEngine:
+    """
+    Simulates the audience poll and the phone-a-friend answer for every rung of the ladder.
+    The chance that the audience (or the friend) knows the answer depends on the difficulty
+    and goes down from the first rung to the last one.
+
+    The tables are stored relative to the correct answer: column 0 is always the correct
+    answer and columns 1 to 3 are the wrong answers in the order they appear in the question.
+    """
+    # chance of knowing the answer on the (first rung, last rung)
+    AUDIENCE = {"easy": (0.85, 0.55), "medium": (0.75, 0.40), "hard": (0.60, 0.30)}
+    FRIEND = {"easy": (0.90, 0.60), "medium": (0.80, 0.45), "hard": (0.65, 0.30)}
+    # the higher the concentration, the closer the poll is to the expected shares
+    CONCENTRATION = 10.0
+
+    def __init__(self, difficulty: str = "easy", rungs: int = 15, seed: int = None):
+        self.difficulty = self.__level(difficulty)
+        self.rungs = max(1, rungs)
+        self.seed = seed
+        rng = np.random.default_rng(seed)
+        ladder = np.linspace(0.0, 1.0, self.rungs)
+        self.polls = self.sample_polls(self.accuracy(self.AUDIENCE, ladder), rng = rng)
+        knows = rng.random(self.rungs) < self.accuracy(self.FRIEND, ladder)
+        self.friend_knows = knows
+        self.friend_confidence = np.where(knows, rng.beta(8.0, 2.0, self.rungs), rng.beta(2.0, 5.0, self.rungs))
+        # the order the friend would guess the answers in when they do not know it
+        self.friend_guesses = np.argsort(rng.random((self.rungs, 4)), axis = 1)
+
+    @staticmethod
+    def __level(difficulty: str) -> str:
+        difficulty = str(difficulty).lower()
+        return difficulty if difficulty in LifelineEngine.AUDIENCE else "easy"
+
+    def accuracy(self, table: dict, ladder, difficulty: str = None):
+        """The chance of knowing the answer, ladder is the position on the ladder between 0 and 1"""
+        first, last = table[self.__level(difficulty or self.difficulty)]
+        return first + (last - first) * np.asarray(ladder, dtype = float)
+
+    def sample_polls(self, accuracy, size: int = None, rng = None):
+        """
+        Draws audience polls from a Dirichlet distribution (normalized gamma draws).
+        accuracy is the expected share of the correct answer, either one value per poll
+        or a single value repeated size times. Returns an array of shape (polls, 4)
+        """
+        rng = rng or np.random.default_rng()
+        accuracy = np.asarray(accuracy, dtype = float)
+        if size is not None:
+            accuracy = np.broadcast_to(accuracy, (size,))
+        alpha = np.empty(accuracy.shape + (4,))
+        alpha[..., 0] = accuracy
+        alpha[..., 1:] = ((1.0 - accuracy) / 3.0)[..., None]
+        votes = rng.standard_gamma(alpha * self.CONCENTRATION)
+        return votes / votes.sum(axis = -1, keepdims = True)
+
+    def simulate(self, polls: int, rung: int = 0, rng = None):
+        """Headless simulation of many audience polls for a rung of the ladder"""
+        ladder = min(rung, self.rungs - 1) / max(1, self.rungs - 1)
+        return self.sample_polls(self.accuracy(self.AUDIENCE, ladder), size = polls, rng = rng)
+
+    def __slots(self, question):
+        """Maps the columns of the tables to the positions of the answers of the question"""
+        answers = question.get_answers()
+        correct = answers.index(question.get_correct_answer())
+        return answers, [correct] + [i for i in range(len(answers)) if i != correct]
+
+    def poll(self, rung: int, question) -> dict:
+        """
+        The result of the audience poll in percent for every remaining answer.
+        Answers removed by the fifty-fifty get no votes, their share is split
+        between the remaining answers
+        """
+        answers, slots = self.__slots(question)
+        shares = self.polls[min(rung, self.rungs - 1)]
+        remaining = [(answers[slot], shares[column]) for column, slot in enumerate(slots) if answers[slot] is not None]
+        total = sum(share for _, share in remaining)
+        return {answer: int(round(100 * share / total)) for answer, share in remaining}
+
+    def friend(self, rung: int, question):
+        """The answer of the friend and how sure they are about it (in percent)"""
+        rung = min(rung, self.rungs - 1)
+        answers, slots = self.__slots(question)
+        confidence = int(round(100 * self.friend_confidence[rung]))
+        if self.friend_knows[rung]:
+            return answers[slots[0]], confidence
+        for column in self.friend_guesses[rung]:
+            if answers[slots[column]] is not None:
+                return answers[slots[column]], confidence
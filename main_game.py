@@ -1,33 +1,114 @@
+import time
+from collections import deque
 from game import Game
+from questions import NotEnoughQuestionsError
 from screens import *
-from questions import QuestionGenerator
+from prefetch import Prefetcher
+from snapshot import Snapshot
+from leaderboard import Leaderboard
 
+# the design resolution, the window itself can be resized to any size
 SCREEN_WIDTH = 1300
 SCREEN_HEIGHT = 650
-def main():
+
+def prepare(resource: Resource, question, spare: QuestionScreen = None):
+    """
+    This method makes the screen of a question, or reuses spare (a screen that is not shown).
+    It is called for the next question while the player is still on the current one
+    """
+    if question is None:
+        return None
+    if spare is None:
+        return QuestionScreen(resource, question, 45)
+    spare.reset(question, 45)
+    return spare
+
+def play(resource: Resource, game: Game, leaderboard: Leaderboard, screens: list = None, timeout: float = None,
+         transitions = None) -> bool:
+    """
+    This method plays the questions of the game one by one until the player
+    wins, loses, runs out of time or closes the window.
+    The screen of the next question is made while the current one is played, so moving
+    on only swaps the screens; the time from the click on the answer to the next question
+    (in ms, saving the snapshot included) is appended to transitions if it is given
+    (e.g. a deque with a maxlen).
+    The two question screens are kept in screens so that the next game can reuse them (the kiosk).
+    Once the game is over its snapshot is removed, then the final score is recorded on the
+    leaderboard and the message is shown until the window is closed, or for timeout seconds.
+    Returns False if the window was closed
+    """
+    if screens is None:
+        screens = [None, None]
+    turn = 0
+    question_screen = None
+    answered_at = None
+    for question in game:
+        if question_screen is None or question_screen.question.question is not question.question:
+            question_screen = screens[turn] = prepare(resource, question, screens[turn])
+        spare = screens[1 - turn]
+        shown = question_screen.display(lambda: prepare(resource, game.peek(), spare))
+        if answered_at is not None and transitions is not None:
+            transitions.append((question_screen.shown_at - answered_at) * 1000)
+        if not shown:
+            if question_screen.is_timed_out():
+                game.finish()
+                leaderboard.record(game.generator.subject, game.generator.difficulty, game.score)
+                return LoseMessageScreen(resource, game).display(timeout)
+            return False
+        # before check_answer, which saves the snapshot of the game
+        answered_at = time.perf_counter()
+        if not question.check_answer(question_screen.answer):
+            game.finish()
+            leaderboard.record(game.generator.subject, game.generator.difficulty, game.score)
+            return LoseMessageScreen(resource, game).display(timeout)
+        if question_screen.prepared is not None:
+            screens[1 - turn] = question_screen.prepared
+        question_screen = question_screen.prepared
+        turn = 1 - turn
+    game.finish()
+    leaderboard.record(game.generator.subject, game.generator.difficulty, game.score)
+    return WinMessageScreen(resource).display(timeout)
+
+def main(report = print):
     """
     This method in the main_game module encapsulates all the complexity in the previous modules.
     Combining all the inheritance, abstractions, encapsulations, etc and controling the gameflow.
+    If the previous run crashed in the middle of a game, that game is resumed from its snapshot
+    without fetching the questions again. Otherwise the questions are fetched in the background
+    while the player is on the selection screen; if not enough of them can be found, the player
+    is told so instead of starting an empty game. The counters of the prefetcher are given to
+    report once the questions are taken, and the time it took to show every next question
+    once the game is over.
     """
-    with Resource(SCREEN_WIDTH, SCREEN_HEIGHT) as resource:
-        game = Game()
-        if not IntroScreen(resource).display():
-            return
-        selection = SelectionScreen(resource)
-        if not selection.display():
-            return
-        question_gen = QuestionGenerator(selection.subject, selection.difficulty, 15)
-        game.set_generator(question_gen)
-        for question in game:
-            question_screen = QuestionScreen(resource, question, 45)
-            if not question_screen.display():
-                if question_screen.is_timed_out():
-                    LoseMessageScreen(resource, game).display()
-                return
-            if not question.check_answer(question_screen.answer):
-                LoseMessageScreen(resource, game).display()                
+    with Resource(SCREEN_WIDTH, SCREEN_HEIGHT) as resource, Leaderboard() as leaderboard:
+        snapshot = Snapshot()
+        game = snapshot.load()
+        if game is None:
+            game = Game(snapshot)
+            if not IntroScreen(resource).display():
                 return
-        WinMessageScreen(resource).display()
+            with Prefetcher(15) as prefetcher:
+                selection = SelectionScreen(resource, prefetcher)
+                if not selection.display():
+                    return
+                try:
+                    question_gen = prefetcher.take(selection.subject, selection.difficulty)
+                except NotEnoughQuestionsError:
+                    NoQuestionsMessageScreen(resource).display()
+                    return
+            # after the prefetcher is closed, so the fetches that were not used count as wasted
+            report(prefetcher.report())
+            game.set_generator(question_gen)
+            game.save()
+        else:
+            resource.use_lifelines(game.used_lifelines())
+        # one time for every question after the first, at most the whole ladder
+        transitions = deque(maxlen = 15)
+        play(resource, game, leaderboard, transitions = transitions)
+        snapshot.clear()
+        if len(transitions) != 0:
+            times = ", ".join(f"{ms:.1f}" for ms in transitions)
+            report(f"next question shown after the answer: {times} ms (at most {max(transitions):.1f} ms)")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,170 @@
+import time
+import threading
+from collections import OrderedDict
+from dedup import QuestionIndex
+from questions import QuestionGenerator, INDEX_PATH
+
+"""
+In this module, the questions are fetched speculatively while the player is still on the
+selection screen, so that the game usually starts without waiting for the API.
+"""
+
+class Prefetcher:
+    """
+    Fetches the questions for the subject and difficulty highlighted on the selection screen
+    in a background thread. A fetch starts once the selection has not changed for delay
+    seconds. If the selection changes before the fetch has started, the fetch is replaced by one
+    for the new selection. A fetch that is already running cannot be stopped, so its result is
+    kept (the last keep results) in case the player goes back to that selection.
+    The questions of a fetch are only marked as asked in the shared index when they are taken,
+    so the fetches that are never used do not use up questions.
+    All the generators share one index (the question index file by default) and ask url
+    with apikey (the API by default).
+    The counters (stats()) tell how often the game could start straight away (hits) and how many
+    fetches were never used (wasted).
+    """
+    def __init__(self, n: int = 15, delay: float = 0.3, keep: int = 2, factory = None,
+                 index: QuestionIndex = None, url: str = None, apikey: str = None):
+        self.n = n
+        self.delay = delay
+        self.keep = keep
+        # one index shared by all the generators, so that they do not overwrite each other's file
+        self.index = QuestionIndex(INDEX_PATH) if index is None else index
+        self.factory = factory or (lambda subject, difficulty: QuestionGenerator(
+            subject, difficulty, n, url, apikey, index = self.index, commit = False))
+        self.cond = threading.Condition()
+        self.selection = None
+        self.changed = 0.0
+        self.wanted = None
+        self.running = None
+        self.ready = OrderedDict()
+        self.closed = False
+        self.started = 0
+        self.hits = 0
+        self.waited_hits = 0
+        self.misses = 0
+        self.wasted = 0
+        self.cancelled = 0
+        self.wait_time = 0.0
+        threading.Thread(target = self.__work, daemon = True).start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def update(self, subject: str, difficulty: str):
+        """ Called every frame with the current selection"""
+        key = (subject, difficulty)
+        now = time.monotonic()
+        if key != self.selection:
+            self.selection = key
+            self.changed = now
+        elif now - self.changed >= self.delay:
+            self.__want(key)
+
+    def __want(self, key):
+        with self.cond:
+            if key in self.ready:
+                self.ready.move_to_end(key)
+                return
+            if key == self.wanted or key == self.running:
+                return
+            if self.wanted is not None:
+                # the previous selection was still waiting to start, it is dropped
+                self.cancelled += 1
+            self.wanted = key
+            self.cond.notify_all()
+
+    def __work(self):
+        """ The background thread: fetches the wanted selection, one at a time"""
+        while True:
+            with self.cond:
+                while self.wanted is None and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                key = self.running = self.wanted
+                self.wanted = None
+                self.started += 1
+            try:
+                generator = self.factory(*key)
+            except Exception:
+                # e.g. not enough questions: take() fetches again and shows the error
+                generator = None
+            with self.cond:
+                self.running = None
+                if self.closed:
+                    return
+                if generator is None:
+                    self.wasted += 1
+                    self.cond.notify_all()
+                    continue
+                self.ready[key] = generator
+                while len(self.ready) > self.keep:
+                    self.ready.popitem(last = False)
+                    self.wasted += 1
+                self.cond.notify_all()
+
+    def take(self, subject: str, difficulty: str) -> QuestionGenerator:
+        """
+        The questions for the chosen selection: straight away if they were prefetched,
+        after the running fetch if it is for this selection, or fetched now otherwise
+        """
+        key = (subject, difficulty)
+        start = time.monotonic()
+        generator = None
+        with self.cond:
+            if self.wanted is not None:
+                self.cancelled += 1
+                self.wanted = None
+            waited = key == self.running
+            while key == self.running:
+                self.cond.wait()
+            if key in self.ready:
+                generator = self.ready.pop(key)
+                self.hits += 1
+                if waited:
+                    self.waited_hits += 1
+        if generator is None:
+            self.misses += 1
+            generator = self.factory(*key)
+        # only the questions that are played are marked as asked
+        generator.commit()
+        self.wait_time += time.monotonic() - start
+        return generator
+
+    def stats(self) -> dict:
+        """ The counters of the prefetcher so far"""
+        with self.cond:
+            taken = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "waited_hits": self.waited_hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / taken if taken else 0.0,
+                "started": self.started,
+                "wasted": self.wasted,
+                "cancelled": self.cancelled,
+                "wait_time": self.wait_time
+            }
+
+    def report(self) -> str:
+        stats = self.stats()
+        return (
+            f"prefetch: {stats['hits']} hits ({stats['waited_hits']} still in flight), {stats['misses']} misses, "
+            f"hit rate {stats['hit_rate']:.0%}, {stats['started']} fetches started, {stats['wasted']} wasted, "
+            f"{stats['cancelled']} cancelled before starting, {stats['wait_time']:.2f}s waited"
+        )
+
+    def close(self):
+        """
+        Stops the background thread, the results that were not used and the fetch
+        still running are counted as wasted
+        """
+        with self.cond:
+            self.closed = True
+            self.wasted += len(self.ready) + (self.running is not None)
+            self.ready.clear()
+            self.cond.notify_all()
@@ -0,0 +1,157 @@
+import re
+import json
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+"""
+In this module, the prompts sent to the API are put together.
+A prompt is made from one short template per subject and difficulty instead of the
+long list of instructions that was sent before, and where the endpoint supports it
+the format of the answer is given as a JSON schema so the reply is always valid JSON.
+"""
+
+class PromptBuilder:
+    """
+    Builds the request for n questions on a subject and difficulty and keeps the
+    token count of every prompt it has built in tokens, and how it was counted in sources:
+    "api" once the endpoint has reported the prompt_tokens of a request (record_usage),
+    "tiktoken" with the tokenizer of the model, or "estimate" when tiktoken (an optional
+    package) is not installed. If structured is True, the
+    request asks for output that follows SCHEMA (the response_format of the chat
+    completions API), otherwise the format is only described in the prompt.
+    """
+    LEVELS = {"easy": "junior high school", "medium": "senior high school", "hard": "university"}
+    SYSTEM = "You write quiz questions for Who Wants to Be a Millionaire. Reply with JSON only, no other text."
+    TEMPLATE = "Write {n} {difficulty} multiple choice questions ({level} level) about {subject}."
+    # added for the next batches of the same subject and difficulty, so they do not ask for the same output
+    VARIANT = " This is set {variant}: pick topics and facts other sets would not."
+    FORMAT = ' Format: {{"questions":[{{"question":str,"choices":[4 distinct str],"answer":"A"|"B"|"C"|"D"}}]}}'
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "questions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "question": {"type": "string"},
+                        "choices": {"type": "array", "items": {"type": "string"}, "minItems": 4, "maxItems": 4},
+                        "answer": {"type": "string", "enum": ["A", "B", "C", "D"]}
+                    },
+                    "required": ["question", "choices", "answer"],
+                    "additionalProperties": False
+                }
+            }
+        },
+        "required": ["questions"],
+        "additionalProperties": False
+    }
+    # the chat format adds a few tokens for every message and for the reply
+    TOKENS_PER_MESSAGE = 4
+    TOKENS_PER_REPLY = 3
+
+    def __init__(self, structured: bool = False, model: str = "gpt-35-turbo"):
+        self.structured = structured
+        self.model = model
+        self.tokens = {}
+        self.sources = {}
+
+    @staticmethod
+    def key(subject: str, difficulty: str, n: int):
+        """ The key of a prompt in tokens and sources"""
+        return (subject, str(difficulty).lower(), n)
+
+    @staticmethod
+    def counting() -> str:
+        """ How the tokens are counted before the endpoint reports them"""
+        return "tiktoken" if get_encoding() is not None else "estimate"
+
+    def messages(self, subject: str, difficulty: str, n: int, variant: int = 0) -> list:
+        """ The messages of the prompt for n questions, variant numbers the batches of a bank"""
+        difficulty = str(difficulty).lower()
+        content = self.TEMPLATE.format(n = n, difficulty = difficulty, level = self.LEVELS.get(difficulty, "junior high school"), subject = subject)
+        if variant:
+            content += self.VARIANT.format(variant = variant + 1)
+        if not self.structured:
+            content += self.FORMAT.format()
+        return [
+            {"role": "system", "content": self.SYSTEM},
+            {"role": "user", "content": content}
+        ]
+
+    def payload(self, subject: str, difficulty: str, n: int, variant: int = 0) -> str:
+        """ The body of the request, its token count is recorded in tokens"""
+        body = {"model": self.model, "messages": self.messages(subject, difficulty, n, variant)}
+        if self.structured:
+            body["response_format"] = {
+                "type": "json_schema",
+                "json_schema": {"name": "questions", "strict": True, "schema": self.SCHEMA}
+            }
+        tokens = self.count(body["messages"])
+        if self.structured:
+            # the schema is read by the model as well, so it counts towards the prompt
+            tokens += self.count_text(json.dumps(self.SCHEMA, separators = (",", ":")))
+        key = self.key(subject, difficulty, n)
+        if self.sources.get(key) != "api":
+            self.tokens[key] = tokens
+            self.sources[key] = self.counting()
+        return json.dumps(body, separators = (",", ":"))
+
+    def record_usage(self, subject: str, difficulty: str, n: int, data) -> bool:
+        """
+        Keeps the prompt_tokens reported in the usage of a response of the endpoint
+        instead of the counted ones. Returns False if the response has none
+        """
+        usage = data.get("usage") if isinstance(data, dict) else None
+        if not isinstance(usage, dict) or not isinstance(usage.get("prompt_tokens"), int):
+            return False
+        key = self.key(subject, difficulty, n)
+        self.tokens[key] = usage["prompt_tokens"]
+        self.sources[key] = "api"
+        return True
+
+    def count_text(self, text: str) -> int:
+        """
+        The number of tokens in a text. It uses the tokenizer of the model when tiktoken
+        is installed and only an estimate (words and punctuation) otherwise
+        """
+        encoding = get_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return len(re.findall(r"\w+|[^\w\s]", text))
+
+    def count(self, messages) -> int:
+        """ The number of prompt tokens of a list of messages"""
+        return sum(self.TOKENS_PER_MESSAGE + self.count_text(message["content"]) for message in messages) + self.TOKENS_PER_REPLY
+
+_encoding = []
+
+def get_encoding():
+    """
+    The tokenizer of the model, loaded once. tiktoken downloads it the first time,
+    so it is None when tiktoken is not installed or the download fails
+    """
+    if len(_encoding) == 0:
+        try:
+            _encoding.append(tiktoken.get_encoding("cl100k_base") if tiktoken is not None else None)
+        except Exception:
+            _encoding.append(None)
+    return _encoding[0]
+
+def extract_json(content: str):
+    """
+    Reads the JSON out of the reply of the model. The reply is expected to be only JSON,
+    but a reply wrapped in a code block or in a sentence is still accepted
+    """
+    try:
+        return json.loads(content)
+    except ValueError:
+        pass
+    start = min((i for i in (content.find("["), content.find("{")) if i != -1), default = -1)
+    end = max(content.rfind("]"), content.rfind("}"))
+    if start == -1 or end <= start:
+        raise ValueError("no JSON in the reply")
+    return json.loads(content[start:end + 1])
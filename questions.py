@@ -1,8 +1,13 @@
 import os
-import json
 import random
 import requests
 from dotenv import load_dotenv
+from dedup import QuestionIndex
+from prompts import PromptBuilder, extract_json
+
+INDEX_PATH = "question_index.bin"
+SUBJECTS = ["General Knowledge", "Maths", "Sciences", "Geography"]
+DIFFICULTIES = ["Easy", "Medium", "Hard"]
 
 class Question:
     """
@@ -38,13 +43,36 @@ class Question:
     def check_answer(self, selected_answer):
         return selected_answer == self._correct_answer
     
+class NotEnoughQuestionsError(Exception):
+    """
+    This class is to signal that the API did not give enough new questions for a game
+    """
+    def __init__(self, subject: str, difficulty: str, found: int, wanted: int):
+        super().__init__(f"only {found} of {wanted} new questions for {subject} ({difficulty})")
+        self.subject = subject
+        self.difficulty = difficulty
+        self.found = found
+        self.wanted = wanted
+
 class QuestionGenerator:
-    def __init__(self, subject = "Who wants to be a millionaire", difficulty = "easy", n = 15, url = None, apikey = None):
+    """
+    Fetches the questions from the API. Every question is checked against the
+    QuestionIndex first so that questions already asked in an earlier game
+    (or a near duplicate of them) are dropped and fetched again.
+    Requests are sent until n questions are found, at most ATTEMPTS of them (failed
+    ones included); if there are still not enough, NotEnoughQuestionsError is raised.
+    The questions are only added to the index by commit(), straight away unless commit is
+    False (a prefetched game that may never be played must not mark its questions as asked)
+    """
+    ATTEMPTS = 8
+    URL = (
+        "https://cuhk-api-dev1-apim1.azure-api.net/openai/"
+        "deployments/gpt-35-turbo/chat/completions?api-version=2023-05-15"
+    )
+
+    def __init__(self, subject = "General Knowledge", difficulty = "easy", n = 15, url = None, apikey = None, index = None, structured = False, commit = True):
         if url is None:
-            self.url = (
-                "https://cuhk-api-dev1-apim1.azure-api.net/openai/"
-                "deployments/gpt-35-turbo/chat/completions?api-version=2023-05-15"
-            )
+            self.url = self.URL
         else:
             self.url = url
         if apikey is None:
@@ -53,66 +81,135 @@ class QuestionGenerator:
         else:
             self.apikey = apikey
 
-        if subject == "General Knowledge":
-            self.subject = "Who wants to be a millionaire"
-        else:
-            self.subject = subject
+        # the subject as it is shown on the selection screen, the API is asked for its topic
+        self.subject = subject
         self.difficulty = difficulty
+        # the default endpoint (api-version 2023-05-15) does not support structured output
+        self.prompts = PromptBuilder(structured)
         self.questions = []
         self.n = n
-        while True:
+        if index is None:
+            self.index = QuestionIndex(INDEX_PATH)
+        else:
+            self.index = index
+        # the questions of this game, to drop the duplicates within it before they are committed
+        self.staged = QuestionIndex()
+        attempts = 0
+        while len(self.questions) < self.n and attempts < self.ATTEMPTS:
+            attempts += 1
             try:
                 self.__get()
-            except:
+            except Exception:
                 continue
-            break
+        if len(self.questions) < self.n:
+            raise NotEnoughQuestionsError(subject, difficulty, len(self.questions), self.n)
+        if commit:
+            self.commit()
 
-    def __get(self):
-        payload = json.dumps({
-            "model": "gpt-35-turbo",
-            "messages": [
-                {
-                    "role": "user",
-                    "content": "Hello!"
-                },
-                {
-                    "role": "assistant",
-                    "content": "Hello! How can I assist you today?"            
-                },
-                {
-                    "role": "user",
-                    "content": f"We have a total of three difficulties: easy, medium and difficult. Give me only {self.n} different multiple choice {self.difficulty} question (who wants to be a millionaire level) about {self.subject} alone with its answer. The easy level should be around junior high school topic, the medium level should be around senior high school topic, and the hard level should be around university level topic. Output only {self.n} question. Outputting more questions or fewer questions will be not be tolerated. The choices must include the correct answer."
-                },
-                {
-                    "role": "user",
-                    "content": "I want you to give an answer that contains only the question, the options, and the letters corresponding to the answers; I don't need the words for everything else. I do not want any text accompanying your reply."
-                },
-                #{
-                #    "role": "user",
-                #    "content": f"I'd like your output to be formatted like: texts that you feel confident in answering this question, only the content of question, choices, only the letter of answer. Please make sure to always provide 4 choices of answer"
-                #},
-                {
-                    "role": "user",
-                    "content": f"Output only a JSON array without any additional text containing {self.n} dictionaries that have keys named 'question', 'choices', and 'answer' with questions being a string that contains only the content of the question, choices being a JSON array that contains only the answer options for the questions with A being the first element, B being the second element, C being the third element, and D being the fourth element, and the string answer which contains the letter corresponding to the index of the correct answer in the choices array (e.g. output A if the correct answer lies in the first index of the choices array). Do not include the letter in the choices array."
-                },
-                {
-                    "role": "user",
-                    "content": f"Your task is to only output only one JSON array containing only {self.n} dictionaries. The JSON dictionaries can only contain the keys named 'question', 'choices', and 'answer'; any other dictionary keys are not tolerated and are incorrect. Any other output, including English plaintext or JSON dictionaries, is not tolerated. Only valid JSON is accepted. You must not reply to my prompt in english plaintext or with anything that does not constitute valid JSON. Please only output a plain JSON string"
-                },
-            ]
-        })
+    def commit(self):
+        """ Marks the questions of this game as asked in the index, so later games do not get them"""
+        if self.staged is None:
+            return
+        for question in self.questions:
+            self.index.add(question.get_question_text(), question.get_answers())
+        self.index.save()
+        self.staged = None
+
+    @classmethod
+    def restore(cls, subject, difficulty, questions):
+        """
+        Makes a generator from questions that were already fetched (e.g. from a snapshot)
+        without calling the API
+        """
+        generator = cls.__new__(cls)
+        generator.url = None
+        generator.apikey = None
+        generator.subject = subject
+        generator.difficulty = difficulty
+        generator.questions = list(questions)
+        generator.n = len(generator.questions)
+        generator.index = None
+        generator.staged = None
+        generator.prompts = PromptBuilder()
+        return generator
 
+    @staticmethod
+    def topic(subject):
+        """ The subject as it is asked to the API"""
+        if subject == "General Knowledge":
+            return "Who wants to be a millionaire"
+        return subject
+
+    @staticmethod
+    def subject_of(topic):
+        """ The subject of the selection screen for a topic asked to the API"""
+        if topic == "Who wants to be a millionaire":
+            return "General Knowledge"
+        return topic
+
+    @staticmethod
+    def is_valid(question) -> bool:
+        """
+        Checks one question returned by the API: a non-empty question,
+        four different non-empty choices and an answer letter from A to D
+        """
+        if not isinstance(question, dict):
+            return False
+        text, choices, answer = question.get("question"), question.get("choices"), question.get("answer")
+        if not isinstance(text, str) or len(text.strip()) == 0:
+            return False
+        if not isinstance(choices, list) or len(choices) != 4:
+            return False
+        if not all(isinstance(choice, str) and len(choice.strip()) != 0 for choice in choices):
+            return False
+        if len(set(choices)) != 4:
+            return False
+        return isinstance(answer, str) and answer.strip().lower() in ("a", "b", "c", "d")
+
+    @staticmethod
+    def parse(data, weighting = 100000):
+        """
+        Reads the questions out of the response of the API.
+        The reply is either a JSON array of questions or (with structured output) an object
+        with the array under "questions". The invalid questions are left out, a reply
+        without JSON raises an error
+        """
+        questions = extract_json(data["choices"][0]["message"]["content"])
+        if isinstance(questions, dict):
+            questions = questions["questions"]
+        return [
+            Question(question["question"], question["choices"], question["answer"].strip(), weighting)
+            for question in questions
+            if QuestionGenerator.is_valid(question)
+        ]
+
+    @staticmethod
+    def fetch(url, apikey, subject, difficulty, n, prompts = None, variant = 0):
+        """
+        Sends one request to the API and returns the valid questions of its response.
+        variant changes the prompt a little, for the next batches of the same subject and difficulty
+        """
+        if prompts is None:
+            prompts = PromptBuilder()
         headers = {
             'Content-Type': 'application/json',
             'Cache-Control': 'no-cache',
-            'Ocp-Apim-Subscription-Key': self.apikey
+            'Ocp-Apim-Subscription-Key': apikey
         }
-
-        response = requests.request("POST", self.url, headers = headers, data = payload)
-
+        payload = prompts.payload(subject, difficulty, n, variant)
+        response = requests.request("POST", url, headers = headers, data = payload)
         data = response.json()
-        for question in json.loads(data["choices"][0]["message"]["content"]):
-            self.questions.append(Question(question["question"], question["choices"], question["answer"], 100000))
+        # the endpoint counts the prompt exactly, better than the count made before sending it
+        prompts.record_usage(subject, difficulty, n, data)
+        return QuestionGenerator.parse(data)
+
+    def __get(self):
+        for question in self.fetch(self.url, self.apikey, self.topic(self.subject), self.difficulty, self.n, self.prompts):
+            if len(self.questions) == self.n:
+                break
+            text, answers = question.get_question_text(), question.get_answers()
+            if not self.index.contains(text, answers) and self.staged.add(text, answers):
+                self.questions.append(question)
 
     def __next__(self):
         """
@@ -121,6 +218,12 @@ class QuestionGenerator:
         if len(self.questions) == 0:
             raise StopIteration
         return self.questions.pop(0)
+
+    def peek(self):
+        """ The question that comes next without taking it, None if there is none left"""
+        if len(self.questions) == 0:
+            return None
+        return self.questions[0]
     
     def __iter__(self):
         """ Function defining the object as iterator"""
@@ -1,8 +1,11 @@
 import math
+import time
 import pygame
 from abc import ABC, abstractmethod
 from widgets import RadioButton
+from layout import Layout, AssetCache, make_dpi_aware
 from game import Game, GameQuestion, UsedLifelineError
+from questions import SUBJECTS, DIFFICULTIES
 
 """
 In this module, we are trying to separate different screens
@@ -14,30 +17,33 @@ class Resource:
     Contains all the resources such as screen width, screen height,
     background music, clock, sound effects, fonts, and buttons.
     This is to ease the usage throughout all the functions and modules in the future. 
+    The width and height passed in are the design resolution, the window can be resized
+    afterwards and everything is laid out again through the layout.
     """
     def __init__(self, width: int, height: int):
-        self.width = width
-        self.height = height
+        self.design_width = width
+        self.design_height = height
+        make_dpi_aware()
         pygame.init()
         pygame.mixer.init()
-        pygame.mixer.music.load("sound\obgm.mp3") 
+        self.bgm = "sound\obgm.mp3"
+        pygame.mixer.music.load(self.bgm) 
         pygame.mixer.music.play(-1)
         self.clock = pygame.time.Clock()
-        self.screen = pygame.display.set_mode([width, height])
+        # the event of the countdown, made once: pygame leaks a little memory every
+        # time a timer is set with an event type instead of an event
+        self.second = pygame.event.Event(pygame.USEREVENT)
+        # the frames per second of every screen, 0 runs the screens as fast as possible (soak.py)
+        self.fps = 60
+        self.assets = AssetCache()
+        self.used = set()
+        desktop_width, desktop_height = pygame.display.get_desktop_sizes()[0]
+        scale = min(1, desktop_width / width, (desktop_height - 80) / height)
+        self.screen = pygame.display.set_mode([round(width * scale), round(height * scale)], pygame.RESIZABLE)
         self.notif = pygame.mixer.Sound("sound\obuttonclick.mp3")
         self.clap = "sound\clapping.mp3"
         self.youlose = "sound\youlost.mp3"
-        self.font = pygame.font.Font("Font\ofont.ttf", 50)
-        self.font50 = pygame.font.Font("Font\ofont.ttf", 25)
-        self.font_gk = pygame.font.Font("Font\ofont.ttf", 15)
-        self.font_question = pygame.font.SysFont(None, 50)
-        self.font_timer = pygame.font.Font("Font\ofont.ttf", 20)
-        self.callafriend = pygame.image.load("images\jpgePhone.jpg").convert_alpha()
-        self.callafriend_rect = pygame.rect.Rect((width - self.callafriend.get_width()) / 2, 100, self.callafriend.get_width(), self.callafriend.get_height())
-        self.eliminate50 = pygame.image.load("images\jpge50.jpg").convert_alpha()
-        self.eliminate50_rect = pygame.rect.Rect(((width - self.callafriend.get_width()) / 2) - self.eliminate50.get_width() - 50, 100, self.eliminate50.get_width(), self.eliminate50.get_height())
-        self.asktheaudience = pygame.image.load("images\jpgePeople.jpg").convert_alpha()
-        self.asktheaudience_rect = pygame.rect.Rect(((width - self.callafriend.get_width()) / 2) + self.asktheaudience.get_width() + 50, 100, self.asktheaudience.get_width(), self.asktheaudience.get_height())
+        self.resize(*self.screen.get_size())
 
     def __enter__(self):
         """ This function is to enter the main game and utilizing the resources"""
@@ -48,17 +54,66 @@ class Resource:
         pygame.mixer.quit()
         pygame.quit()
 
+    def resize(self, width: int, height: int):
+        """
+        This function is called when the window is resized.
+        It recomputes the layout, the fonts and the lifeline icons for the new size;
+        the images come from the asset cache so they are never decoded or scaled twice
+        """
+        self.width = width
+        self.height = height
+        self.screen = pygame.display.get_surface()
+        self.layout = Layout(self.design_width, self.design_height, width, height)
+        size = self.layout.size
+        self.font = self.assets.font("Font\ofont.ttf", size(50))
+        self.font50 = self.assets.font("Font\ofont.ttf", size(25))
+        self.font_gk = self.assets.font("Font\ofont.ttf", size(15))
+        self.font_question = self.assets.font(None, size(50))
+        self.font_timer = self.assets.font("Font\ofont.ttf", size(20))
+        self.__lifeline_icons()
+
+    def __lifeline_icons(self):
+        """ This function places the three lifeline icons, crossed out if they are used"""
+        scale = self.layout.scale
+        top = self.layout.y(100)
+        gap = self.layout.size(50)
+        self.callafriend = self.assets.scaled_by("images\jpgePhoneX.jpg" if "Phone a Friend" in self.used else "images\jpgePhone.jpg", scale)
+        self.callafriend_rect = pygame.rect.Rect((self.width - self.callafriend.get_width()) / 2, top, self.callafriend.get_width(), self.callafriend.get_height())
+        self.eliminate50 = self.assets.scaled_by("images\jpge50X.jpg" if "Fifty-Fifty" in self.used else "images\jpge50.jpg", scale)
+        self.eliminate50_rect = pygame.rect.Rect(((self.width - self.callafriend.get_width()) / 2) - self.eliminate50.get_width() - gap, top, self.eliminate50.get_width(), self.eliminate50.get_height())
+        self.asktheaudience = self.assets.scaled_by("images\jpgePeopleX.jpg" if "Ask the Audience" in self.used else "images\jpgePeople.jpg", scale)
+        self.asktheaudience_rect = pygame.rect.Rect(((self.width - self.callafriend.get_width()) / 2) + self.asktheaudience.get_width() + gap, top, self.asktheaudience.get_width(), self.asktheaudience.get_height())
+
     def use_callafriend(self):
         """ This function is to initialize the lifeline call a friend"""
-        self.callafriend = pygame.image.load("images\jpgePhoneX.jpg").convert_alpha()
+        self.used.add("Phone a Friend")
+        self.__lifeline_icons()
 
     def use_eliminate50(self):
         """ This function is to initialize the lifeline fifty-fifty"""
-        self.eliminate50 = pygame.image.load("images\jpge50X.jpg").convert_alpha()
+        self.used.add("Fifty-Fifty")
+        self.__lifeline_icons()
 
     def use_asktheaudience(self):
         """ This function is to initialize the lifeline ask the audience"""
-        self.asktheaudience = pygame.image.load("images\jpgePeopleX.jpg").convert_alpha()
+        self.used.add("Ask the Audience")
+        self.__lifeline_icons()
+
+    def use_lifelines(self, names):
+        """ This function crosses out the lifelines already used in a resumed game"""
+        self.used.update(names)
+        self.__lifeline_icons()
+
+    def reset(self):
+        """
+        This function gets the resources ready for a new game: the lifeline icons are
+        no longer crossed out and the background music is played again after the win or lose music
+        """
+        self.used.clear()
+        self.__lifeline_icons()
+        pygame.mixer.music.unload()
+        pygame.mixer.music.load(self.bgm)
+        pygame.mixer.music.play(-1)
 
 class MultilineText:
     """
@@ -86,6 +141,7 @@ class MultilineText:
         self.color = color
         self.ypos = ypos
         self.spacing = spacing
+        self.lines = None
 
     def __split(self, width: int):
         """
@@ -134,34 +190,32 @@ class MultilineText:
         else:
             return output.get_height()
 
-    def __display_multiline(self):
+    def prepare(self):
         """
-        This function serves as the private function that hides the specific
-        details about displaying the multiple lines on the question screen.
-        It eases and simplifies the content presented in the display() function as
-        it is then called in the display (self) function
+        This function splits the text into lines if it is too wide (using __split())
+        and renders every line once with its position, so that displaying the text
+        afterwards only has to blit the rendered lines
         """
-        for i, line in enumerate(self.text):
+        if type(self.text) != list:
+            output = self.font.render(self.text, self.antialias, self.color)
+            if output.get_width() > self.resources.width:
+                self.__split(output.get_width())
+        lines = self.text if type(self.text) == list else [self.text]
+        self.lines = []
+        for i, line in enumerate(lines):
             output = self.font.render(line, self.antialias, self.color)
             rect = ((self.resources.width - output.get_width()) / 2, self.ypos + ((output.get_height() + self.spacing) * i))
-            self.resources.screen.blit(output, rect)
+            self.lines.append((output, rect))
 
     def display(self):
         """
-        This function calls the __display_multiline() function, __split(),
-        and the get_width() functions as it
-        acts as the mother functions which outputs the display onto the screen
+        This function outputs the lines onto the screen,
+        they are prepared the first time it is called if they were not already
         """
-        if type(self.text) == list:
-            self.__display_multiline()
-        else:
-            output = self.font.render(self.text, self.antialias, self.color)
-            if output.get_width() > self.resources.width:
-                self.__split(output.get_width())
-                self.__display_multiline()
-            else:
-                rect = ((self.resources.width - output.get_width()) / 2, self.ypos)
-                self.resources.screen.blit(output, rect)
+        if self.lines is None:
+            self.prepare()
+        for output, rect in self.lines:
+            self.resources.screen.blit(output, rect)
 
 class Screen(ABC):
     """
@@ -170,9 +224,52 @@ class Screen(ABC):
     as well as encapsulation.
     """
     resources = None
+    observer = None
+    # the layout of the window the screen was last laid out for
+    placed = None
 
     def __init__(self, resources: Resource):
         self.resources = resources
+
+    def layout(self):
+        """ This method places the widgets of the screen for the current size of the window"""
+        pass
+
+    def check_layout(self):
+        """
+        This method lays the screen out again if the window was resized since it was last
+        laid out, e.g. while another screen was shown (screens are reused by the kiosk)
+        """
+        if self.placed is not self.resources.layout:
+            self.placed = self.resources.layout
+            self.layout()
+
+    def check_resize(self, event_list) -> bool:
+        """
+        This method resizes the resources and lays the screen out again
+        when the window has been resized
+        """
+        sizes = [event.size for event in event_list if event.type == pygame.VIDEORESIZE]
+        if len(sizes) == 0:
+            return False
+        # only the last size matters when the window was resized several times in one frame
+        self.resources.resize(*sizes[-1])
+        self.check_layout()
+        return True
+
+    def next_frame(self) -> list:
+        """
+        This method waits for the next frame and returns its events, after resizing
+        the screen if needed. If an observer is set (e.g. the automatic player of soak.py),
+        it is given the screen first so that it can post its own events
+        """
+        self.resources.clock.tick(self.resources.fps)
+        if Screen.observer is not None:
+            Screen.observer(self)
+        event_list = pygame.event.get()
+        if not self.check_resize(event_list):
+            self.check_layout()
+        return event_list
     
     @abstractmethod
     def display():
@@ -187,18 +284,23 @@ class IntroScreen(Screen):
     """
     def __init__(self, resource: Resource):
         super().__init__(resource)
-        logo = pygame.image.load('images\logo.png').convert_alpha()
-        self.logo = pygame.transform.scale(logo, (450, 450))
+        self.check_layout()
+
+    def layout(self):
+        """ This method places the logo and the start button"""
+        resource = self.resources
+        size = resource.layout.size(450)
+        self.logo = resource.assets.scaled('images\logo.png', (size, size))
         self.logo_center = (
             (resource.width - self.logo.get_width()) / 2,
-            (resource.height - self.logo.get_height()) / 2 - 85
+            (resource.height - self.logo.get_height()) / 2 - resource.layout.y(85)
         )
 
-        start = pygame.image.load('images\start.png').convert_alpha()
-        self.start = pygame.transform.scale(start, (150, 150))
+        size = resource.layout.size(150)
+        self.start = resource.assets.scaled('images\start.png', (size, size))
         self.start_center = (
             (resource.width - self.start.get_width()) / 2,
-            (resource.height - self.start.get_height()) / 2 + 250
+            (resource.height - self.start.get_height()) / 2 + resource.layout.y(250)
         )
         self.start_rect = pygame.Rect(self.start_center[0], self.start_center[1], self.start.get_width(), self.start.get_height())
 
@@ -208,18 +310,17 @@ class IntroScreen(Screen):
         screen(ABC)’s display() abstract method
         """
         while True:
-            self.resources.clock.tick(60)
+            event_list = self.next_frame()
             self.resources.screen.fill((224, 170, 62))
             self.resources.screen.blit(self.logo, self.logo_center)
             self.resources.screen.blit(self.start, self.start_center)
-            event_list = pygame.event.get()
             pygame.display.flip()
             for event in event_list:
                 if event.type == pygame.QUIT:
                     return False
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # Left mouse button clicked
-                        mouse_pos = pygame.mouse.get_pos()
+                        mouse_pos = event.pos
                         if self.start_rect.collidepoint(mouse_pos):
                             self.resources.notif.play()
                             return True
@@ -230,24 +331,30 @@ class SelectionScreen(Screen):
     utilize the initialized fonts, texts, etc.
     and this class will overwrite the screen class
     """
-    def __init__(self, resource: Resource):
+    # the position and size of the radio buttons in the design resolution and their font,
+    # in the same order as the SUBJECTS and DIFFICULTIES
+    TOPICS = [
+        ((50, 150, 200, 60), "font_gk"),
+        ((377, 150, 200, 60), "font50"),
+        ((704, 150, 200, 60), "font50"),
+        ((1030, 150, 200, 60), "font50")
+    ]
+    LEVELS = [
+        ((50, 450, 200, 60), "font50"),
+        ((550, 450, 200, 60), "font50"),
+        ((1030, 450, 200, 60), "font50")
+    ]
+
+    def __init__(self, resource: Resource, prefetcher = None):
         super().__init__(resource)
         self.subject = None
         self.difficulty = None
-        next = pygame.image.load("images\onext.png").convert_alpha()
-        self.next = pygame.transform.scale(next, (100, 100))
-        self.next_rect = pygame.Rect(resource.width - self.next.get_width() - 30, resource.height - self.next.get_height() - 30, self.next.get_width(), self.next.get_height())
-        self.radioButtons1 = [
-            RadioButton(50, 150, 200, 60, resource.font_gk, "General Knowledge"),
-            RadioButton(377, 150, 200, 60, resource.font50, "Maths"),
-            RadioButton(704, 150, 200, 60, resource.font50, "Sciences"),  
-            RadioButton(1030, 150, 200, 60, resource.font50, "Geography")
-        ]
-        self.radioButtons2 = [
-            RadioButton(50, 450, 200, 60, resource.font50, "Easy"),
-            RadioButton(resource.screen.get_rect().centerx - 100, 450, 200, 60, resource.font50, "Medium"),
-            RadioButton(1030, 450, 200, 60, resource.font50, "Hard")
-        ]
+        # if given, the questions for the highlighted choice are fetched while the player decides
+        self.prefetcher = prefetcher
+        layout = resource.layout
+        self.radioButtons1 = [RadioButton(*layout.rect(*rect), getattr(resource, font), text, resource.notif) for (rect, font), text in zip(self.TOPICS, SUBJECTS)]
+        self.radioButtons2 = [RadioButton(*layout.rect(*rect), getattr(resource, font), text, resource.notif) for (rect, font), text in zip(self.LEVELS, DIFFICULTIES)]
+        self.check_layout()
         for rb in self.radioButtons1:
             rb.setRadioButtons(self.radioButtons1)
         self.radioButtons1[0].clicked = True
@@ -257,6 +364,21 @@ class SelectionScreen(Screen):
         self.radioButtons2[0].clicked = True
         self.group1 = pygame.sprite.Group(self.radioButtons1)
         self.group2 = pygame.sprite.Group(self.radioButtons2)
+
+    def layout(self):
+        """ This method places the next button and the radio buttons"""
+        resource = self.resources
+        layout = resource.layout
+        size = layout.size(100)
+        self.next = resource.assets.scaled("images\onext.png", (size, size))
+        self.next_rect = pygame.Rect(resource.width - self.next.get_width() - layout.size(30), resource.height - self.next.get_height() - layout.size(30), self.next.get_width(), self.next.get_height())
+        for rb, (rect, font) in zip(self.radioButtons1 + self.radioButtons2, self.TOPICS + self.LEVELS):
+            rb.place(*layout.rect(*rect), getattr(resource, font))
+
+    @staticmethod
+    def selected(radioButtons) -> str:
+        """ The text of the clicked radio button of a group"""
+        return [(rb.text) for rb in radioButtons if rb.clicked][0]
     
     def display(self) -> bool:
         """
@@ -264,18 +386,19 @@ class SelectionScreen(Screen):
         screen(ABC)’s display() abstract method
         """
         while True:
-            self.resources.clock.tick(60)
-            event_list = pygame.event.get()
+            event_list = self.next_frame()
             self.resources.screen.fill((224, 170, 62))
             text1 = self.resources.font.render("Choose your topic:", True, (255, 255, 255))
             text2 = self.resources.font.render("Choose the level of difficulty:", True, (255, 255, 255))
-            text1_rect = (50, 50)
-            text2_rect = (50, 325)
+            text1_rect = (self.resources.layout.x(50), self.resources.layout.y(50))
+            text2_rect = (self.resources.layout.x(50), self.resources.layout.y(325))
             self.resources.screen.blit(text1, text1_rect)
             self.resources.screen.blit(text2, text2_rect)
             self.resources.screen.blit(self.next, self.next_rect)
             self.group1.update(event_list)
             self.group2.update(event_list)
+            if self.prefetcher is not None:
+                self.prefetcher.update(self.selected(self.radioButtons1), self.selected(self.radioButtons2))
             # Draw the button surface and text on the screen
             for rb in self.radioButtons1:
                 self.resources.screen.blit(rb.image, rb.rect)
@@ -285,11 +408,11 @@ class SelectionScreen(Screen):
             for event in event_list:
                 if event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:  # Left mouse button clicked
-                        mouse_pos = pygame.mouse.get_pos()
+                        mouse_pos = event.pos
                         if self.next_rect.collidepoint(mouse_pos):
                             self.resources.notif.play()
-                            self.subject = [(rb.text) for rb in self.radioButtons1 if rb.clicked][0]
-                            self.difficulty = [(rb.text) for rb in self.radioButtons2 if rb.clicked][0]
+                            self.subject = self.selected(self.radioButtons1)
+                            self.difficulty = self.selected(self.radioButtons2)
                             return True
                 elif event.type == pygame.QUIT:
                     return False
@@ -299,26 +422,84 @@ class QuestionScreen(Screen):
     """
     This class inherits from the resource class to
     utilize the initialized fonts, texts, etc.
-    and this class will overwrite the screen class
+    and this class will overwrite the screen class.
+    Everything that does not change while the question is played (the buttons, the wrapped
+    question text and the labels) is rendered when the screen is made, so the screen of the
+    next question can be made in advance and shown without any work left to do
     """
     def __init__(self, resources: Resource, question: GameQuestion, time: int):
         super().__init__(resources)
+        # one button for every answer, reused for the next questions
+        self.buttons = [RadioButton(*self.__choice_rect(i), resources.font_question, "", resources.notif) for i in range(4)]
+        self.choice_group = pygame.sprite.Group()
+        self.reset(question, time)
+
+    def reset(self, question: GameQuestion, time: int):
+        """ This method gets the screen ready for a question, so that a screen can be reused"""
         self.question = question
         self.counter = time
         self.timeout = False
-        width = (resources.width - 90) / 2
-        answers = question.get_answers()
-        self.choices = [
-            RadioButton(30, self.resources.height - 60 - 200, width, 60, resources.font_question, answers[0]),
-            RadioButton(width + 60, self.resources.height - 60 - 200, width, 60, resources.font_question, answers[2]),
-            RadioButton(30, self.resources.height - 60 - 100, width, 60, resources.font_question, answers[1]),
-            RadioButton(width + 60, self.resources.height - 60 - 100, width, 60, resources.font_question, answers[3])
-        ]
-        for button in self.choices:
-            button.setRadioButtons(self.choices)
-        self.choice_group = pygame.sprite.Group(self.choices)
+        # the votes of the audience for every answer, once the lifeline is used
+        self.votes = None
+        self.__make_choices()
+        self.layout()
         self.suggested_answer = None
         self.suggested_answer_prompt = None
+        # the result of the idle task given to display() and when the first frame was shown
+        self.prepared = None
+        self.shown_at = None
+
+    def __choice_rect(self, i: int):
+        """
+        The place of the i-th answer, A and B are on the left and C and D on the right.
+        It is computed in the design resolution and then mapped to the window
+        """
+        layout = self.resources.layout
+        width = (layout.design_width - 90) / 2
+        return layout.rect(width + 60 if i > 1 else 30, layout.design_height - 60 - (100 if i % 2 else 200), width, 60)
+
+    def __make_choices(self):
+        """ This method uses a radio button for every answer that is still available"""
+        answers = self.question.get_answers()
+        self.positions = [i for i, answer in enumerate(answers) if answer is not None]
+        self.choices = [self.buttons[i] for i in self.positions]
+        for button, i in zip(self.choices, self.positions):
+            button.text = answers[i]
+            button.clicked = False
+            button.setRadioButtons(self.choices)
+        self.choice_group.empty()
+        self.choice_group.add(*self.choices)
+
+    def __place_choices(self):
+        """ This method draws the answer buttons at their place"""
+        for button, i in zip(self.choices, self.positions):
+            button.place(*self.__choice_rect(i), self.resources.font_question)
+
+    def __render_votes(self):
+        """ This method renders the share of the votes above every answer that is still available"""
+        self.vote_texts = []
+        if self.votes is None:
+            return
+        for button in self.choices:
+            if button.text in self.votes:
+                text = self.resources.font_timer.render(f"{self.votes[button.text]}%", True, (255, 255, 255))
+                self.vote_texts.append((text, (button.rect.right - text.get_width(), button.rect.top - text.get_height() - self.resources.layout.y(5))))
+
+    def layout(self):
+        """
+        This method places the answer buttons and renders the question text and
+        the labels for the current size of the window
+        """
+        resources = self.resources
+        layout = resources.layout
+        self.placed = layout
+        self.__place_choices()
+        self.question_text = MultilineText(resources, self.question.get_question_text(), layout.y(200), layout.size(20))
+        self.question_text.prepare()
+        self.weighting1_text = resources.font_timer.render("Weighting:", True, (255, 255, 255))
+        self.Totalscore_text = resources.font_timer.render("Total Score:", True, (255, 255, 255))
+        self.weighting_text = resources.font_timer.render(f"{self.question.get_weighting():,}", True, (255, 255, 255))
+        self.__render_votes()
 
     def is_timed_out(self):
         """This method checks if the player ran out of time (which was set to 45 seconds per question)"""
@@ -330,47 +511,53 @@ class QuestionScreen(Screen):
         This method shows the process of displaying the question screen.
         This method is later called by the display method in this class
         """
+        layout = self.resources.layout
         self.resources.screen.fill((224, 170, 62))
-        question = MultilineText(self.resources, self.question.get_question_text(), 200, 20)
-        question.display()
+        self.question_text.display()
         self.resources.screen.blit(self.resources.eliminate50, self.resources.eliminate50_rect)
         #change5050(event_list)
         self.resources.screen.blit(self.resources.callafriend, self.resources.callafriend_rect)
         self.resources.screen.blit(self.resources.asktheaudience, self.resources.asktheaudience_rect)
         text = str(self.counter).rjust(3) if self.counter > 0 else 'Game Over!'
         timer_text = self.resources.font_timer.render(f"Seconds:{text}", True, (255, 255, 255))
-        timer_text_rect = ((self.resources.width - timer_text.get_width()) / 2, 20)
-        weighting1_text = self.resources.font_timer.render("Weighting:", True, (255, 255, 255))
-        weighting1_text_rect = (30, 20)
-        self.resources.screen.blit(weighting1_text, weighting1_text_rect)
-        Totalscore_text = self.resources.font_timer.render("Total Score:", True, (255, 255, 255))
-        Totalscore_text_rect = ((self.resources.width - Totalscore_text.get_width()) -30, 20)
-        self.resources.screen.blit(Totalscore_text, Totalscore_text_rect)
+        timer_text_rect = ((self.resources.width - timer_text.get_width()) / 2, layout.y(20))
+        weighting1_text_rect = (layout.x(30), layout.y(20))
+        self.resources.screen.blit(self.weighting1_text, weighting1_text_rect)
+        Totalscore_text_rect = ((self.resources.width - self.Totalscore_text.get_width()) - layout.x(30), layout.y(20))
+        self.resources.screen.blit(self.Totalscore_text, Totalscore_text_rect)
         self.resources.screen.blit(timer_text, timer_text_rect)
-        weighting_text = self.resources.font_timer.render(f"{self.question.get_weighting():,}", True, (255, 255, 255))
-        self.resources.screen.blit(weighting_text, (30, 40))
+        self.resources.screen.blit(self.weighting_text, (layout.x(30), layout.y(40)))
         score_text = self.resources.font_timer.render(f"{self.question.get_score():,}", True, (255, 255, 255))
-        self.resources.screen.blit(score_text, (self.resources.width - score_text.get_width() - 30, 40))
+        self.resources.screen.blit(score_text, (self.resources.width - score_text.get_width() - layout.x(30), layout.y(40)))
         for rb in self.choices:
             self.resources.screen.blit(rb.image, rb.rect)
+        for text, position in self.vote_texts:
+            self.resources.screen.blit(text, position)
         self.choice_group.update(event_list)
         if self.suggested_answer is not None:
             answer_text = self.resources.font_question.render(f"{self.suggested_answer_prompt} \"{self.suggested_answer}\".", True, (255, 255, 255))
-            answer_rect = ((self.resources.width - answer_text.get_width()) / 2, self.resources.height - answer_text.get_height() - 30)
+            answer_rect = ((self.resources.width - answer_text.get_width()) / 2, self.resources.height - answer_text.get_height() - layout.y(30))
             self.resources.screen.blit(answer_text, answer_rect)
         pygame.display.flip()
 
-    def display(self) -> bool:
+    def display(self, idle = None) -> bool:
         """
         Display method will call the __show method
         to ease the displaying and overriding of the Screen class.
+        If idle is given, it is called once in the first frame without any input
+        (e.g. to make the screen of the next question) and its result kept in prepared
         """
-        pygame.time.set_timer(pygame.USEREVENT, 1000)
+        # the window may have been resized after this screen was made
+        self.check_layout()
+        pygame.time.set_timer(self.resources.second, 1000)
         self.__show([])
+        self.shown_at = time.perf_counter()
 
         while self.counter != 0:
-            self.resources.clock.tick(60)
-            event_list = pygame.event.get()
+            event_list = self.next_frame()
+            if idle is not None and len(event_list) == 0:
+                self.prepared = idle()
+                idle = None
             self.__show(event_list)
             for event in event_list:
                 if event.type == pygame.USEREVENT:
@@ -378,33 +565,33 @@ class QuestionScreen(Screen):
                     self.__show(event_list)
                 elif event.type == pygame.MOUSEBUTTONDOWN:
                     if event.button == 1:
-                        mouse_pos = pygame.mouse.get_pos()
+                        mouse_pos = event.pos
                         if self.resources.callafriend_rect.collidepoint(mouse_pos):
                             self.resources.notif.play()
                             self.resources.use_callafriend()
                             try:
-                                self.suggested_answer = self.question.use_lifeline("Phone a Friend")
-                                self.suggested_answer_prompt = "Your friend answered"
+                                self.suggested_answer, confidence = self.question.use_lifeline("Phone a Friend")
+                                self.suggested_answer_prompt = f"Your friend is {confidence}% sure it is"
                             except UsedLifelineError:
                                 continue
                         elif self.resources.asktheaudience_rect.collidepoint(mouse_pos):
                             self.resources.notif.play()
                             self.resources.use_asktheaudience()
                             try:
-                                self.suggested_answer = self.question.use_lifeline("Ask the Audience")
-                                self.suggested_answer_prompt = "The audience answered"
+                                self.votes = self.question.use_lifeline("Ask the Audience")
                             except UsedLifelineError:
                                 continue
+                            self.__render_votes()
                         elif self.resources.eliminate50_rect.collidepoint(mouse_pos):
                             self.resources.notif.play()
                             self.resources.use_eliminate50()
-                            self.question.use_lifeline("Fifty-Fifty")
-                            width = (self.resources.width - 90) / 2
-                            answers = self.question.get_answers()
-                            self.choices = [RadioButton(width + 60 if i > 1 else 30, self.resources.height - 60 - (100 if i % 2 else 200), width, 60, self.resources.font_question, answer) for i, answer in enumerate(answers) if answer is not None]
-                            for button in self.choices:
-                                button.setRadioButtons(self.choices)
-                            self.choice_group = pygame.sprite.Group(self.choices)
+                            try:
+                                self.question.use_lifeline("Fifty-Fifty")
+                            except UsedLifelineError:
+                                continue
+                            self.__make_choices()
+                            self.__place_choices()
+                            self.__render_votes()
                         else:
                             self.choice_group.update(event_list)
                             choice = [rb.text for rb in self.choices if rb.clicked]
@@ -426,25 +613,35 @@ class MessageScreen(Screen):
     def __init__(self, resources: Resource, text: str):
         super().__init__(resources)
         self.text = text
+        self.check_layout()
 
-    def display(self) -> bool:
+    def layout(self):
+        """ This method renders the lines of the message once for the current size of the window"""
+        lines = self.text.split("\n")
+        self.lines_output = [self.resources.font.render(line, True, (255, 255, 255)) for line in lines]
+        line_height = self.lines_output[0].get_height() + 10
+        first_y = (self.resources.height - (len(lines) * self.lines_output[0].get_height()) - ((len(lines) - 1) * 10)) / 2
+        self.lines_rect = [((self.resources.width - line.get_width()) / 2, first_y + (line_height * i)) for i, line in enumerate(self.lines_output)]
+
+    def display(self, timeout: float = None) -> bool:
         """
-        This method is to format the message display of the screen (including padding and line separations)
+        This method is to format the message display of the screen (including padding and line separations).
+        Without a timeout the message stays until the window is closed (returns False),
+        with a timeout (the kiosk) it also returns True after timeout seconds or a click
         """
-        while True:
-            self.resources.clock.tick(60)
+        start = time.monotonic()
+        while timeout is None or time.monotonic() - start < timeout:
+            event_list = self.next_frame()
             self.resources.screen.fill((224, 170, 62))
-            lines = self.text.split("\n")
-            lines_output = [self.resources.font.render(line, True, (255, 255, 255)) for line in lines]
-            line_height = lines_output[0].get_height() + 10
-            first_y = (self.resources.height - (len(lines) * lines_output[0].get_height()) - ((len(lines) - 1) * 10)) / 2
-            lines_rect = [((self.resources.width - line.get_width()) / 2, first_y + (line_height * i)) for i, line in enumerate(lines_output)]
-            for out, rect in zip(lines_output, lines_rect):
+            for out, rect in zip(self.lines_output, self.lines_rect):
                 self.resources.screen.blit(out, rect)
             pygame.display.flip()
-            for event in pygame.event.get():
+            for event in event_list:
                 if event.type == pygame.QUIT:
                     return False
+                elif event.type == pygame.MOUSEBUTTONDOWN and timeout is not None:
+                    return True
+        return True
 
 class WinMessageScreen(MessageScreen):
     """
@@ -453,14 +650,14 @@ class WinMessageScreen(MessageScreen):
     def __init__(self, resources: Resource):
         super().__init__(resources, "Congratulations!\nYou win!\nA millionaire is found")
         
-    def display(self):
+    def display(self, timeout: float = None) -> bool:
         """
         This method is to format the message display of the screen (including padding and line separations)
         """
         pygame.mixer.music.unload()
         pygame.mixer.music.load(self.resources.clap)
         pygame.mixer.music.play()
-        super().display()
+        return super().display(timeout)
 
 class LoseMessageScreen(MessageScreen):
     """
@@ -469,11 +666,77 @@ class LoseMessageScreen(MessageScreen):
     def __init__(self, resources: Resource, game: Game):
         super().__init__(resources, f"Game Over!\nSomeone's not getting\na million dollars today\nYour Final Score: {game.score:,}")
 
-    def display(self):
+    def display(self, timeout: float = None) -> bool:
         """
         This method is to format the message display of the screen (including padding and line separations)
         """
         pygame.mixer.music.unload()
         pygame.mixer.music.load(self.resources.youlose)
         pygame.mixer.music.play()
-        super().display()
\ No newline at end of file
+        return super().display(timeout)
+
+class NoQuestionsMessageScreen(MessageScreen):
+    """
+    This class overrides the MessageScreen class to tell the player that no game
+    can be started because not enough new questions were found
+    """
+    def __init__(self, resources: Resource):
+        super().__init__(resources, "Sorry!\nNot enough new questions\ncould be found\nPlease try again later")
+
+class AttractScreen(Screen):
+    """
+    This class shows the best scores of every topic and level in turn while the kiosk
+    is waiting for the next player. The pages are rendered once for the current size
+    of the window and only blitted afterwards
+    """
+    def __init__(self, resources: Resource, leaderboard, page_time: float = 4):
+        super().__init__(resources)
+        self.leaderboard = leaderboard
+        self.page_time = page_time
+        self.pages = []
+
+    def layout(self):
+        """ This method renders a page for every topic and level that has scores"""
+        resources = self.resources
+        layout = resources.layout
+        self.pages = []
+        for subject in SUBJECTS:
+            for difficulty in DIFFICULTIES:
+                records = self.leaderboard.top(subject, difficulty, 5)
+                if len(records) == 0:
+                    continue
+                lines = [resources.font.render(f"{subject} ({difficulty})", True, (255, 255, 255))]
+                lines += [resources.font50.render(f"{i}. {record['name'] or record['kiosk']}   {record['score']:,}", True, (255, 255, 255)) for i, record in enumerate(records, 1)]
+                y = layout.y(60)
+                page = []
+                for line in lines:
+                    page.append((line, ((resources.width - line.get_width()) / 2, y)))
+                    y += line.get_height() + layout.y(20)
+                self.pages.append(page)
+        self.hint = resources.font50.render("Click to play", True, (255, 255, 255))
+
+    def display(self, timeout: float = 30) -> bool:
+        """
+        This method returns True after a click or after timeout seconds,
+        and False if the window is closed
+        """
+        # the scores change after every game, so the pages are rendered again every time
+        self.placed = None
+        self.check_layout()
+        start = time.monotonic()
+        while time.monotonic() - start < timeout:
+            event_list = self.next_frame()
+            self.resources.screen.fill((224, 170, 62))
+            if len(self.pages) != 0:
+                page = self.pages[int((time.monotonic() - start) / self.page_time) % len(self.pages)]
+                for line, position in page:
+                    self.resources.screen.blit(line, position)
+            self.resources.screen.blit(self.hint, ((self.resources.width - self.hint.get_width()) / 2, self.resources.height - self.hint.get_height() - self.resources.layout.y(30)))
+            pygame.display.flip()
+            for event in event_list:
+                if event.type == pygame.QUIT:
+                    return False
+                elif event.type == pygame.MOUSEBUTTONDOWN:
+                    self.resources.notif.play()
+                    return True
+        return True
\ No newline at end of file
@@ -0,0 +1,87 @@
+import os
+import json
+import zlib
+from game import Game
+from lifelines import LifelineEngine
+from questions import Question, QuestionGenerator
+
+"""
+In this module, the state of the game is saved to disk while it is played so that
+the game can carry on where it stopped if the program crashes, without asking the
+API for the questions again.
+"""
+
+SNAPSHOT_PATH = "session.snapshot"
+
+class Snapshot:
+    """
+    Saves and loads the state of a Game: the score, the remaining lifelines, the rung,
+    the question being played (with the answers removed by the fifty-fifty) and the
+    questions left. The state is stored as compressed JSON and written to a temporary
+    file that is then renamed, so the snapshot on disk is always a complete one.
+    """
+    VERSION = 1
+
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        self.path = path
+
+    @staticmethod
+    def __question(question: Question) -> list:
+        answers = question.get_answers()
+        letter = chr(ord('a') + answers.index(question.get_correct_answer()))
+        return [question.get_question_text(), answers, letter, question.weighting]
+
+    def save(self, game: Game):
+        """ Writes the state of the game, called after every answer and every lifeline"""
+        questions = list(game.generator.questions)
+        rung = game.rung + 1
+        if game.current is not None:
+            questions.insert(0, game.current)
+            rung -= 1
+        state = {
+            "version": self.VERSION,
+            "subject": game.generator.subject,
+            "difficulty": game.generator.difficulty,
+            "score": game.score,
+            "lifelines": list(game.lifelines),
+            "rung": rung,
+            "rungs": game.engine.rungs,
+            "seed": game.engine.seed,
+            "questions": [self.__question(question) for question in questions]
+        }
+        data = zlib.compress(json.dumps(state, separators = (",", ":")).encode("utf-8"))
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp, self.path)
+
+    def load(self):
+        """
+        Rebuilds the game from the snapshot.
+        Returns None if there is no snapshot or it cannot be read
+        """
+        try:
+            with open(self.path, "rb") as file:
+                state = json.loads(zlib.decompress(file.read()))
+            if state["version"] != self.VERSION:
+                return None
+            questions = [Question(text, answers, letter, weighting) for text, answers, letter, weighting in state["questions"]]
+        except (OSError, ValueError, KeyError, TypeError, zlib.error):
+            return None
+        game = Game(self)
+        # older snapshots kept the topic asked to the API instead of the subject
+        game.generator = QuestionGenerator.restore(QuestionGenerator.subject_of(state["subject"]), state["difficulty"], questions)
+        game.engine = LifelineEngine(state["difficulty"], state["rungs"], state["seed"])
+        game.score = state["score"]
+        game.rung = state["rung"] - 1
+        for name in list(game.lifelines):
+            if name not in state["lifelines"]:
+                del game.lifelines[name]
+        return game
+
+    def clear(self):
+        """ Removes the snapshot once the game is over"""
+        if os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,116 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+import tracemalloc
+
+# no window and no sound card are needed
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+from screens import Screen, Resource, IntroScreen, SelectionScreen, QuestionScreen, MessageScreen, AttractScreen
+from dedup import QuestionIndex
+from prefetch import Prefetcher
+from stub_server import serve
+from leaderboard import Leaderboard
+from kiosk import Kiosk
+from main_game import SCREEN_WIDTH, SCREEN_HEIGHT
+
+"""
+A headless soak test of the kiosk mode: thousands of games are played by an automatic
+player as fast as the screens can be drawn, and the memory used by Python objects and
+the number of live surfaces are measured along the way. They should stay flat.
+The questions go through the same path as on a cabinet (the prefetcher, the generator and
+a question index saved after every game) but are asked to stub_server.py. The index is
+bounded by its limit, so it is checked against the limit and its memory is left out of
+the growth of the Python memory (it goes up and down as the oldest questions are dropped).
+"""
+
+class Player:
+    """
+    Plays the kiosk through Screen.observer: every few frames it posts a click on the
+    current screen, answering correctly with the given accuracy and sometimes using a lifeline
+    """
+    def __init__(self, rng: random.Random, accuracy: float = 0.8, lifelines: float = 0.1, every: int = 3):
+        self.rng = rng
+        self.accuracy = accuracy
+        self.lifelines = lifelines
+        self.every = every
+        self.frames = 0
+
+    def click(self, pos):
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, button = 1, pos = (int(pos[0]), int(pos[1]))))
+
+    def __call__(self, screen: Screen):
+        self.frames += 1
+        if self.frames % self.every != 0:
+            return
+        rng = self.rng
+        if isinstance(screen, IntroScreen):
+            self.click(screen.start_rect.center)
+        elif isinstance(screen, SelectionScreen):
+            self.click(rng.choice(screen.radioButtons1).rect.center)
+            self.click(rng.choice(screen.radioButtons2).rect.center)
+            self.click(screen.next_rect.center)
+        elif isinstance(screen, QuestionScreen):
+            resources = screen.resources
+            if rng.random() < self.lifelines:
+                rect = rng.choice([resources.callafriend_rect, resources.eliminate50_rect, resources.asktheaudience_rect])
+                self.click(rect.center)
+                return
+            correct = screen.question.question.get_correct_answer()
+            right = [button for button in screen.choices if button.text == correct]
+            wrong = [button for button in screen.choices if button.text != correct]
+            button = right[0] if rng.random() < self.accuracy or len(wrong) == 0 else rng.choice(wrong)
+            self.click(button.rect.center)
+        elif isinstance(screen, (MessageScreen, AttractScreen)):
+            self.click((0, 0))
+
+def main():
+    parser = argparse.ArgumentParser(description = "Plays the kiosk mode headless and checks that its memory stays flat")
+    parser.add_argument("--games", type = int, default = 10000)
+    parser.add_argument("--every", type = int, default = 500, help = "games between two measurements")
+    parser.add_argument("--warmup", type = int, default = 500, help = "games before the baseline measurement")
+    parser.add_argument("--tolerance", type = int, default = 256, help = "KiB of Python memory growth allowed after the warm-up")
+    parser.add_argument("--surface-tolerance", type = int, default = 2,
+                        help = "live surfaces allowed above the baseline (a text or label may be in the middle of being replaced)")
+    parser.add_argument("--index-limit", type = int, default = 1500, help = "questions kept by the question index")
+    parser.add_argument("--seed", type = int, default = 0)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    random.seed(args.seed)
+    tracemalloc.start()
+    folder = tempfile.mkdtemp()
+    server = serve()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    index = QuestionIndex(os.path.join(folder, "question_index.bin"), args.index_limit)
+    with Resource(SCREEN_WIDTH, SCREEN_HEIGHT) as resource, Leaderboard(os.path.join(folder, "leaderboard.log")) as leaderboard:
+        resource.fps = 0
+        Screen.observer = Player(rng)
+        report = lambda line: print(line, flush = True)
+        prefetcher = Prefetcher(15, delay = 0, index = index, url = url, apikey = "soak")
+        kiosk = Kiosk(resource, leaderboard, result_timeout = 5, attract_timeout = 5, report_every = args.every, report = report, prefetcher = prefetcher)
+        # the measurement made at the end of a run, if the kiosk did not just make it
+        latest = lambda: kiosk.samples[-1] if len(kiosk.samples) != 0 and kiosk.samples[-1]["games"] == kiosk.games else kiosk.measure()
+        try:
+            kiosk.run(args.warmup)
+            baseline = latest()
+            kiosk.run(args.games)
+            final = latest()
+        finally:
+            kiosk.close()
+            server.shutdown()
+    growth = ((final["python_bytes"] - final["index_bytes"]) - (baseline["python_bytes"] - baseline["index_bytes"])) / 1024
+    surfaces = final["surfaces"] - baseline["surfaces"]
+    print(
+        f"after the warm-up: python {growth:+,.0f} KiB (without the index), surfaces {surfaces:+d}, "
+        f"index {final['index_entries']:,} of at most {args.index_limit:,} questions, leaderboard {leaderboard.written:,} results"
+    )
+    flat = growth <= args.tolerance and surfaces <= args.surface_tolerance and final["index_entries"] <= args.index_limit
+    print("flat" if flat else "NOT flat")
+    sys.exit(0 if flat else 1)
+
+if __name__ == "__main__":
+    main()
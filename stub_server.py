@@ -0,0 +1,114 @@
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+A local stand-in for the chat completions endpoint, so that the tools that fetch
+questions in bulk can be run and measured end to end without the real API.
+It answers every request with randomly made up multiple choice questions.
+"""
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers a chat completions request with as many questions as the prompt asks for.
+    The server can be told to be slow (latency) and to send back broken content
+    some of the time (error_rate), to exercise the retries of the clients.
+    Like a model left to answer in free form, it also wraps some replies in a sentence
+    and a code block (chatty_rate). A request with a json_schema response_format always
+    gets a plain JSON object back, as the real endpoint guarantees.
+    """
+    latency = 0.0
+    error_rate = 0.0
+    chatty_rate = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    @staticmethod
+    def make_question(rng: random.Random, subject: str, difficulty: str) -> dict:
+        a, b = rng.randrange(2, 10 ** 6), rng.randrange(2, 10 ** 6)
+        correct = a + b
+        choices = {correct}
+        while len(choices) < 4:
+            choices.add(correct + rng.choice([-1, 1]) * rng.randrange(1, 1000))
+        choices = [str(choice) for choice in rng.sample(sorted(choices), 4)]
+        return {
+            "question": f"{subject} ({difficulty}) #{rng.randrange(10 ** 9)}: what is {a} + {b}?",
+            "choices": choices,
+            "answer": "ABCD"[choices.index(str(correct))]
+        }
+
+    @staticmethod
+    def read_request(body: dict):
+        """ Finds the number of questions, the subject and the difficulty asked for in the prompt"""
+        text = " ".join(str(message.get("content", "")) for message in body.get("messages", []))
+        n = re.search(r"\b(\d+)\b", text)
+        subject = re.search(r"about (.+?)(?: alone| at|[.,]|$)", text)
+        difficulty = re.search(r"\b(easy|medium|hard) (?:multiple choice )?question", text, re.IGNORECASE)
+        return (
+            int(n.group(1)) if n else 15,
+            subject.group(1) if subject else "Trivia",
+            difficulty.group(1).lower() if difficulty else "easy"
+        )
+
+    def content(self, body: dict, rng: random.Random) -> str:
+        n, subject, difficulty = self.read_request(body)
+        questions = [self.make_question(rng, subject, difficulty) for _ in range(n)]
+        if body.get("response_format", {}).get("type") == "json_schema":
+            return json.dumps({"questions": questions})
+        if rng.random() < self.error_rate:
+            return "Sure! Here are your questions: " + json.dumps(questions)[:-10]
+        if rng.random() < self.chatty_rate:
+            return "Sure! Here are your questions:\n```json\n" + json.dumps(questions) + "\n```"
+        return json.dumps(questions)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self.send_error(400)
+            return
+        if self.latency > 0:
+            time.sleep(self.latency)
+        rng = random.Random()
+        content = self.content(body, rng)
+        data = json.dumps({
+            "object": "chat.completion",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+            "usage": {"completion_tokens": len(content) // 4}
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def serve(port: int = 0, latency: float = 0.0, error_rate: float = 0.0, chatty_rate: float = 0.0, handler = StubHandler):
+    """
+    Starts the stand-in server in a background thread and returns it,
+    port 0 picks a free port (see server.server_port)
+    """
+    handler = type("Handler", (handler,), {"latency": latency, "error_rate": error_rate, "chatty_rate": chatty_rate})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    threading.Thread(target = server.serve_forever, daemon = True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Local stand-in for the chat completions API")
+    parser.add_argument("--port", type = int, default = 8000)
+    parser.add_argument("--latency", type = float, default = 0.0, help = "seconds to wait before answering")
+    parser.add_argument("--error-rate", type = float, default = 0.0, help = "share of answers with broken JSON")
+    parser.add_argument("--chatty-rate", type = float, default = 0.0, help = "share of answers wrapped in text")
+    args = parser.parse_args()
+    server = serve(args.port, args.latency, args.error_rate, args.chatty_rate)
+    print(f"Serving on http://127.0.0.1:{server.server_port}/")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
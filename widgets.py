@@ -4,27 +4,41 @@ class RadioButton(pygame.sprite.Sprite):
     """
     The class radio button to ease the declaration of radio buttons
     especially in the selection and question screen.
-    It also eases the tracing of the program as well as debugging
+    It also eases the tracing of the program as well as debugging.
+    The click sound can be shared between buttons, it is only decoded here if none is given
     """
-    def __init__(self, x, y, w, h, font, text):
+    def __init__(self, x, y, w, h, font, text, sound = None):
         super().__init__() 
-        text_surf = font.render(text, True, (0, 0, 0))
-        self.button_image = pygame.Surface((w, h))
+        self.clicked = False
+        self.buttons = None
+        if sound is None:
+            sound = pygame.mixer.Sound("sound\obuttonclick.mp3")
+        self.sound = sound
+        self.text = text
+        self.rect = None
+        self.place(x, y, w, h, font)
+
+    def place(self, x, y, w, h, font):
+        """
+        Draws the button at its position and size,
+        called again with the new values when the window is resized
+        or when the button is reused with another text.
+        The surfaces are only made again if the size has changed
+        """
+        text_surf = font.render(self.text, True, (0, 0, 0))
+        if self.rect is None or self.rect.size != (w, h):
+            self.button_image = pygame.Surface((w, h))
+            self.hover_image = pygame.Surface((w, h))
+            self.clicked_image = pygame.Surface((w, h))
         self.button_image.fill((96, 96, 96))
         self.button_image.blit(text_surf, text_surf.get_rect(center = (w // 2, h // 2)))
-        self.hover_image = pygame.Surface((w, h))
         self.hover_image.fill((96, 96, 96))
         self.hover_image.blit(text_surf, text_surf.get_rect(center = (w // 2, h // 2)))
         pygame.draw.rect(self.hover_image, (96, 196, 96), self.hover_image.get_rect(), 3)
-        self.clicked_image = pygame.Surface((w, h))
         self.clicked_image.fill((96, 196, 96))
         self.clicked_image.blit(text_surf, text_surf.get_rect(center = (w // 2, h // 2)))
-        self.image = self.button_image
+        self.image = self.clicked_image if self.clicked else self.button_image
         self.rect = pygame.Rect(x, y, w, h)
-        self.clicked = False
-        self.buttons = None
-        self.sound = pygame.mixer.Sound("sound\obuttonclick.mp3")
-        self.text = text
 
     def setRadioButtons(self, buttons):
         self.buttons = buttons
@@ -32,15 +46,16 @@ class RadioButton(pygame.sprite.Sprite):
     def update(self, event_list):
         """
         keep updating the status of the radio buttons. 
-        Reacting to mouse hovers and button clicked
+        Reacting to mouse hovers and button clicked,
+        a click is matched with the position where it happened
         """
         hover = self.rect.collidepoint(pygame.mouse.get_pos())
         for event in event_list:
             if event.type == pygame.MOUSEBUTTONDOWN:
-                if hover and event.button == 1:
+                if event.button == 1 and self.rect.collidepoint(event.pos):
                     for rb in self.buttons:
                         rb.clicked = False
-                        rb.sound.play()
+                    self.sound.play()
                     self.clicked = True
         
         self.image = self.button_image